@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 from PyQt5 import QtWidgets
@@ -24,4 +25,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # tag parsing worker processes of the frozen executable start through main
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,90 @@
+"""
+Weighted random choice of albums from the local library.
+
+Genres are drawn with Walker's alias method from tables built once per
+genre settings. Only the row ids of the albums are kept in memory, the chosen
+album is read by its id from the database.
+"""
+
+import logging as log
+import random
+
+from array import array
+
+from . import music_library as mdb
+
+
+class AliasTable:
+    """
+    Draw indices from a discrete distribution in constant time, built with Vose's algorithm.
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        self.probability = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # remaining entries are 1 up to rounding errors
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def __len__(self):
+        return len(self.probability)
+
+    def draw(self):
+        i = random.randrange(len(self.probability))
+        if random.random() < self.probability[i]:
+            return i
+        return self.alias[i]
+
+
+class AlbumSampler:
+    """
+    Random album choice where each genre is weighted by its number of albums times
+    the factor given in genre_weights. Without genre_weights all albums are equally likely.
+    """
+
+    def __init__(self, genre_weights=None):
+        self.genres = []
+        self.album_ids = []
+        self.table = None
+        if genre_weights is None:
+            genre_weights = {None: 1.0}
+
+        weights = []
+        for genre, factor in genre_weights.items():
+            if factor <= 0:
+                continue
+            album_ids = array("q", mdb.get_album_ids(genre))
+            if len(album_ids) > 0:
+                self.genres.append(genre)
+                self.album_ids.append(album_ids)
+                weights.append(len(album_ids) * factor)
+        if weights:
+            self.table = AliasTable(weights)
+
+    def __bool__(self):
+        return self.table is not None
+
+    def choice(self):
+        # returns (artist, album) or None if there is nothing to choose from
+        if self.table is None:
+            return None
+        album_ids = self.album_ids[self.table.draw()]
+        result = mdb.get_album_by_id(album_ids[random.randrange(len(album_ids))])
+        if result is None:
+            log.debug("Library changed since the album sampler was built")
+        return result
@@ -0,0 +1,108 @@
+"""
+Album scenes of recently opened or hovered artists and loading of their albums in the background.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QGraphicsScene, QGraphicsTextItem
+
+from . import music_library as mdb
+
+
+@dataclass
+class AlbumScene:
+    artist: str
+    scene: QGraphicsScene
+    title: QGraphicsTextItem
+    # size of the covers and cover items by album name
+    icon_size: int
+    icons: dict = field(default_factory=dict)
+
+
+class AlbumSceneCache:
+    """
+    Least recently used album scenes by artist.
+    """
+
+    MAX_SCENES = 8
+
+    def __init__(self, max_scenes=MAX_SCENES):
+        self.max_scenes = max_scenes
+        self._scenes = OrderedDict()
+
+    def __contains__(self, artist):
+        return artist in self._scenes
+
+    def get(self, artist):
+        album_scene = self._scenes.get(artist)
+        if album_scene is not None:
+            self._scenes.move_to_end(artist)
+        return album_scene
+
+    def peek(self, artist):
+        # without counting as use
+        return self._scenes.get(artist)
+
+    def put(self, album_scene: AlbumScene):
+        self._scenes[album_scene.artist] = album_scene
+        self._scenes.move_to_end(album_scene.artist)
+        while len(self._scenes) > self.max_scenes:
+            self._scenes.popitem(last=False)
+
+    def remove(self, artist):
+        self._scenes.pop(artist, None)
+
+    def clear(self):
+        self._scenes.clear()
+
+
+class LoadTask(QRunnable):
+    def __init__(self, loader, artist, tier, generation):
+        super().__init__()
+        self.loader = loader
+        self.artist = artist
+        self.tier = tier
+        self.generation = generation
+
+    def run(self):
+        album_data = mdb.get_artist_albums(self.artist, self.tier)
+        self.loader.load_done.emit(self.artist, self.tier, self.generation, album_data)
+
+
+class AlbumLoader(QObject):
+    """
+    Reads the albums of an artist in the background and passes them on through albums_loaded.
+    Results of loads started before the artist was invalidated are dropped.
+    """
+
+    albums_loaded = pyqtSignal(str, int, list)
+    load_done = pyqtSignal(str, int, int, list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._generations = {}
+        self._pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.load_done.connect(self.finished)
+
+    def request(self, artist, tier):
+        key = (artist, tier, self._generations.get(artist, 0))
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self.pool.start(LoadTask(self, *key))
+
+    def invalidate(self, artist):
+        # the albums of the artist changed
+        self._generations[artist] = self._generations.get(artist, 0) + 1
+
+    def finished(self, artist, tier, generation, album_data):
+        self._pending.discard((artist, tier, generation))
+        if generation == self._generations.get(artist, 0):
+            self.albums_loaded.emit(artist, tier, album_data)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
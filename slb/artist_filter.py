@@ -0,0 +1,84 @@
+"""
+Filter the library artists in the background while the user is typing.
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from . import music_library as mdb
+
+
+def filter_artists(artist_index, text, genre=None):
+    """
+    Return the artists of the index matching the lower case filter text and the genre.
+    """
+    if len(text) == 1:
+        artists = artist_index.startswith(text)
+    elif text:
+        # matches words in artist names or in album and genre names of the artist
+        found_artists = set(artist_index.search(text))
+        found_artists.update(mdb.search_artists(text))
+        artists = [a for a in artist_index.artists if a in found_artists]
+    else:
+        artists = list(artist_index.artists)
+    if genre is not None:
+        genre_artists = set(mdb.get_artists(genre))
+        artists = [a for a in artists if a in genre_artists]
+    return artists
+
+
+class FilterTask(QRunnable):
+    def __init__(self, artist_filter, number, artist_index, text, genre):
+        super().__init__()
+        self.artist_filter = artist_filter
+        self.number = number
+        self.artist_index = artist_index
+        self.text = text
+        self.genre = genre
+
+    def run(self):
+        artists = filter_artists(self.artist_index, self.text, self.genre)
+        self.artist_filter.filter_done.emit(self.number, artists)
+
+
+class ArtistFilter(QObject):
+    """
+    Filter requests are collected for DELAY ms after the last one and only the
+    result of the newest request is passed on through artists_filtered.
+    """
+
+    DELAY = 200
+
+    artists_filtered = pyqtSignal(list)
+    filter_done = pyqtSignal(int, list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._request = 0
+        self._artist_index = None
+        self._text = ""
+        self._genre = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.start)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.filter_done.connect(self.finished)
+
+    def request(self, artist_index, text, genre=None):
+        self._artist_index = artist_index
+        self._text = text
+        self._genre = genre
+        self._timer.start(self.DELAY)
+
+    def start(self):
+        self._request += 1
+        # filters of older requests not yet started are obsolete
+        self.pool.clear()
+        self.pool.start(FilterTask(self, self._request, self._artist_index, self._text, self._genre))
+
+    def finished(self, number, artists):
+        if number == self._request:
+            self.artists_filtered.emit(artists)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
@@ -0,0 +1,220 @@
+"""
+Artist grid of the library view.
+
+The grid only keeps a tile item for each artist in or near the viewport. Tiles
+that scroll out of that range are hidden and reused for the rows scrolled into
+view, so the number of items does not depend on the size of the library.
+"""
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class ArtistTile(QtWidgets.QGraphicsItem):
+    """
+    Cover and name of one artist painted by a single item. The name is laid out
+    once per artist and hover state and drawn from a cached QStaticText.
+    """
+
+    LABEL_BACKGROUND = QtGui.QColor(255, 255, 255, 200)
+    # space around the name inside the label background
+    PADDING = 4
+
+    def __init__(self, scene: QtWidgets.QGraphicsScene):
+        super().__init__()
+        self.artist = None
+        self.pixmap = QtGui.QPixmap()
+        self.width = 0.0
+        self.margin = 0.0
+        self.hovered = False
+        self._texts = {}
+        self.font = QtGui.QFont(scene.font())
+        self.hover_font = QtGui.QFont(self.font)
+        self.hover_font.setPointSizeF(self.hover_font.pointSizeF() * 1.5)
+        self.hover_font.setBold(True)
+        self.setAcceptHoverEvents(True)
+        scene.addItem(self)
+
+    def assign(self, artist, x, y, item_scale, margin):
+        self.prepareGeometryChange()
+        if artist != self.artist or item_scale - 2 * margin != self.width:
+            self._texts = {}
+        self.artist = artist
+        self.width = item_scale - 2 * margin
+        self.margin = margin
+        self.hovered = False
+        self.setZValue(0.0)
+        self.setPos(x, y)
+        self.setVisible(True)
+
+    def release(self):
+        self.pixmap = QtGui.QPixmap()
+        self.setVisible(False)
+
+    def set_pixmap(self, pixmap):
+        self.pixmap = pixmap
+        self.update()
+
+    def text(self):
+        # name laid out for the current hover state
+        text = self._texts.get(self.hovered)
+        if text is None:
+            text = QtGui.QStaticText(self.artist)
+            text.setTextFormat(QtCore.Qt.PlainText)
+            text.setTextOption(QtGui.QTextOption(QtCore.Qt.AlignHCenter))
+            text.setTextWidth(max(self.width - 2 * self.PADDING, 1.0))
+            text.prepare(QtGui.QTransform(), self.hover_font if self.hovered else self.font)
+            self._texts[self.hovered] = text
+        return text
+
+    def label_height(self):
+        return self.text().size().height() + 2 * self.PADDING
+
+    def boundingRect(self):
+        return QtCore.QRectF(0.0, 0.0, self.width, max(self.width + self.margin, self.label_height()))
+
+    def paint(self, painter: QtGui.QPainter, option, widget=None):
+        if not self.pixmap.isNull():
+            painter.drawPixmap(QtCore.QPointF(0.0, self.margin), self.pixmap)
+        painter.fillRect(QtCore.QRectF(0.0, 0.0, self.width, self.label_height()), self.LABEL_BACKGROUND)
+        painter.setFont(self.hover_font if self.hovered else self.font)
+        painter.drawStaticText(QtCore.QPointF(self.PADDING, self.PADDING), self.text())
+
+    def set_hovered(self, hovered):
+        self.prepareGeometryChange()
+        self.hovered = hovered
+        # the enlarged name is drawn above the neighbouring tiles
+        self.setZValue(1.0 if hovered else 0.0)
+        self.update()
+
+    def hoverEnterEvent(self, event):
+        self.set_hovered(True)
+
+    def hoverLeaveEvent(self, event):
+        self.set_hovered(False)
+
+
+class ArtistGrid(QtCore.QObject):
+    # rows materialized above and below the viewport
+    OVERSCAN_ROWS = 2
+
+    # artists whose tiles were created or reused and need an icon
+    tiles_shown = QtCore.pyqtSignal(list)
+
+    def __init__(self, view, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.scene = QtWidgets.QGraphicsScene(0, 0, view.FULL_LIBRARY_WIDTH, 0)
+        self.artists = []
+        self.item_scale = 10
+        self.items_per_row = 10
+        self.margin = 5
+        # tiles by index into artists and unused tiles
+        self._tiles = {}
+        self._free = []
+        self._by_artist = {}
+
+        view.verticalScrollBar().valueChanged.connect(self.update_tiles)
+        # the view changes its scale on resize, signals of the view itself are blocked during the library scan
+        view.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Resize:
+            QtCore.QTimer.singleShot(0, self.update_tiles)
+        return False
+
+    def set_layout(self, item_scale, items_per_row, margin):
+        self.item_scale = item_scale
+        self.items_per_row = items_per_row
+        self.margin = margin
+        # all tiles change their size
+        for index in list(self._tiles):
+            self._release(index)
+        self.set_artists(self.artists)
+
+    def set_artists(self, artists, scroll_to_top=False):
+        """
+        Show a new list of artists. Tiles of artists which are still shown keep their label and icon and are
+        only moved, the scene is never rebuilt.
+        """
+        self.artists = list(artists)
+        positions = {artist: i for i, artist in enumerate(self.artists)}
+        tiles = self._tiles
+        self._tiles = {}
+        for tile in tiles.values():
+            if tile.artist in positions:
+                self._tiles[positions[tile.artist]] = tile
+            else:
+                self._by_artist.pop(tile.artist, None)
+                tile.release()
+                self._free.append(tile)
+        rows = (len(self.artists) - 1) // self.items_per_row + 1
+        self.scene.setSceneRect(0, 0, self.view.FULL_LIBRARY_WIDTH, self.item_scale * rows)
+        if scroll_to_top:
+            self.view.verticalScrollBar().setValue(0)
+        self.update_tiles()
+
+    def position(self, index):
+        return (
+            self.item_scale * (index % self.items_per_row),
+            self.item_scale * (index // self.items_per_row),
+        )
+
+    def visible_rows(self, overscan=0):
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        first_row = max(int(visible.top() // self.item_scale) - overscan, 0)
+        last_row = int(visible.bottom() // self.item_scale) + overscan
+        return first_row, last_row
+
+    def visible_artists(self):
+        first_row, last_row = self.visible_rows()
+        return self.artists[first_row * self.items_per_row : (last_row + 1) * self.items_per_row]
+
+    def update_tiles(self):
+        """
+        Create or reuse tiles for the rows near the viewport and release all others.
+        """
+        if self.view.scene() is not self.scene:
+            return
+        first_row, last_row = self.visible_rows(self.OVERSCAN_ROWS)
+        wanted = range(first_row * self.items_per_row, min((last_row + 1) * self.items_per_row, len(self.artists)))
+        for index in list(self._tiles):
+            if index not in wanted:
+                self._release(index)
+        shown = []
+        for index in wanted:
+            if index in self._tiles:
+                self._tiles[index].setPos(*self.position(index))
+                continue
+            tile = self._free.pop() if self._free else ArtistTile(self.scene)
+            artist = self.artists[index]
+            x, y = self.position(index)
+            tile.assign(artist, x, y, self.item_scale, self.margin)
+            self._tiles[index] = tile
+            self._by_artist[artist] = tile
+            shown.append(artist)
+        if shown:
+            self.tiles_shown.emit(shown)
+
+    def _release(self, index):
+        tile = self._tiles.pop(index)
+        self._by_artist.pop(tile.artist, None)
+        tile.release()
+        self._free.append(tile)
+
+    def tile(self, artist):
+        # tile of the artist, None if it is not materialized
+        return self._by_artist.get(artist)
+
+    def artist_at(self, pos: QtCore.QPointF):
+        if pos.x() < 0 or pos.y() < 0:
+            return None
+        column = int(pos.x() // self.item_scale)
+        index = int(pos.y() // self.item_scale) * self.items_per_row + column
+        if column >= self.items_per_row or index >= len(self.artists):
+            return None
+        return self.artists[index]
+
+    def set_icon(self, artist, pixmap):
+        tile = self._by_artist.get(artist)
+        if tile is not None:
+            tile.set_pixmap(pixmap)
@@ -0,0 +1,57 @@
+"""
+In-memory index of all library artists for filtering while typing.
+"""
+
+from bisect import bisect_left
+
+
+class ArtistIndex:
+    """
+    Sorted prefix index of artist names. Besides the full name every word
+    of a name is indexed, so "beat" finds "The Beatles".
+    """
+
+    def __init__(self, artists):
+        self.artists = sorted(set(artists), key=lambda name: (name.lower(), name))
+        entries = []
+        for i, name in enumerate(self.artists):
+            lname = name.lower()
+            entries.append((lname, i))
+            for word in lname.split()[1:]:
+                entries.append((word, i))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._positions = [i for _, i in entries]
+        self._names = [name.lower() for name in self.artists]
+
+    def __len__(self):
+        return len(self.artists)
+
+    def _word_prefix(self, prefix):
+        # positions of all artists with a word starting with prefix
+        start = bisect_left(self._keys, prefix)
+        positions = set()
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(prefix):
+                break
+            positions.add(self._positions[i])
+        return positions
+
+    def startswith(self, prefix):
+        # artists with the full name starting with prefix
+        prefix = prefix.lower()
+        start = bisect_left(self._names, prefix)
+        end = start
+        while end < len(self._names) and self._names[end].startswith(prefix):
+            end += 1
+        return self.artists[start:end]
+
+    def search(self, text):
+        # artists having words starting with each word of the text
+        words = text.lower().split()
+        if not words:
+            return list(self.artists)
+        positions = self._word_prefix(words[0])
+        for word in words[1:]:
+            positions &= self._word_prefix(word)
+        return [self.artists[i] for i in sorted(positions)]
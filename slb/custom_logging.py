@@ -8,7 +8,7 @@ message logLevel.
 import logging
 import sys
 
-from PyQt5 import QtWidgets
+from PyQt5 import QtCore, QtWidgets
 
 from . import BASE_PATH
 from . import __version__ as str_version
@@ -24,25 +24,36 @@ elif "--debug" in sys.argv:
     CONSOLE_LEVEL, FILE_LEVEL, GUI_LEVEL = logging.DEBUG, logging.DEBUG, logging.ERROR
 
 
+class _RecordSignal(QtCore.QObject):
+    record = QtCore.pyqtSignal(object)
+
+
 class QtLogger(logging.Handler):
     """
     Display log messages to the GUI. Information is just displayed in the status bar
     while error and critical events are shown as separate window.
+    Records logged from worker threads are passed to the GUI thread by a queued signal.
     """
 
     def __init__(self, parent: QtWidgets.QMainWindow, status_bar: QtWidgets.QStatusBar):
         super().__init__(min(CONSOLE_LEVEL, GUI_LEVEL))
         self.parent = parent
         self.status_bar = status_bar
+        # created in the GUI thread, so the slot always runs there
+        self._signal = _RecordSignal()
+        self._signal.record.connect(self.show_record)
 
     def emit(self, record: logging.LogRecord):
+        self._signal.record.emit(record)
+
+    def show_record(self, record: logging.LogRecord):
         if record.levelno >= GUI_LEVEL:
             msgbox = QtWidgets.QMessageBox(self.parent)
             msgbox.setText(self.format(record))
             msgbox.setWindowTitle(f"{record.levelname} Message")
             msgbox.exec()
         else:
-            self.status_bar.showMessage(f"{record.levelname}\t{record.message}", 2500)
+            self.status_bar.showMessage(f"{record.levelname}\t{record.getMessage()}", 2500)
 
 
 def setup_system():
@@ -0,0 +1,125 @@
+"""
+Pool of persistent HTTP connections used for artwork requests.
+
+All artwork is served by the same few speakers, so connections are kept open
+and reused per host. The number of concurrent requests to each host is limited
+to not overload a single Sonos device.
+"""
+
+import http.client
+import logging as log
+import threading
+import urllib.error
+import urllib.request
+
+from urllib.parse import urlsplit
+
+
+class HostConnections:
+    """
+    Idle keep-alive connections to one host and the limit of concurrent requests.
+    """
+
+    def __init__(self, scheme, netloc, max_connections, timeout):
+        if scheme == "https":
+            self.connection_class = http.client.HTTPSConnection
+        else:
+            self.connection_class = http.client.HTTPConnection
+        self.netloc = netloc
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _connection(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.connection_class(self.netloc, timeout=self.timeout), False
+
+    def _release(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+
+    def get(self, url, path):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free connection to {self.netloc}")
+        try:
+            connection, reused = self._connection()
+            try:
+                response, data = self._request(connection, path)
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if not reused:
+                    raise
+                # the speaker closed the idle connection, retry once with a new one
+                connection = self.connection_class(self.netloc, timeout=self.timeout)
+                try:
+                    response, data = self._request(connection, path)
+                except (http.client.HTTPException, OSError):
+                    connection.close()
+                    raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+        finally:
+            self._slots.release()
+
+        if response.status in (301, 302, 303, 307, 308):
+            # redirects are rare, e.g. for artwork of streaming services
+            return urllib.request.urlopen(url, timeout=self.timeout).read()
+        if response.status != 200:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        return data
+
+    def _request(self, connection, path):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def close(self):
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle = []
+
+
+class ConnectionPool:
+    def __init__(self, max_per_host=4, timeout=10.0):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """
+        Return the body of a GET request to url.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return urllib.request.urlopen(url, timeout=self.timeout).read()
+        key = (parts.scheme, parts.netloc)
+        with self._lock:
+            if key not in self._hosts:
+                log.debug(f"opening connection pool for {parts.netloc}")
+                self._hosts[key] = HostConnections(parts.scheme, parts.netloc, self.max_per_host, self.timeout)
+            host = self._hosts[key]
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        return host.get(url, path)
+
+    def close(self):
+        with self._lock:
+            for host in self._hosts.values():
+                host.close()
+            self._hosts = {}
+
+
+artwork_connections = ConnectionPool()
+
+
+def fetch(url):
+    # shared by the library scan and the now playing display
+    return artwork_connections.get(url)
@@ -0,0 +1,426 @@
+"""
+Read date, genre and artwork of a track from the ID3v2 tag at the start of the file.
+
+eyed3 also parses the MPEG frame headers after the tag, for files on a network share
+this reads far more than needed. Here only the tag header and the frame headers are
+read, the bodies of unneeded frames are skipped. eyed3 is used as fallback for files
+without ID3v2 tag or with tag features not handled here.
+
+Run as module with a list of files or directories to compare both readers:
+
+    python -m slb.id3_reader /path/to/music
+"""
+
+import builtins
+import io
+import logging as log
+import os
+import struct
+import sys
+import time
+
+import eyed3
+
+from eyed3.id3 import Genre
+
+eyed3.log.setLevel("ERROR")
+
+# upper bound of bytes read for one file, the bodies of skipped frames are not read
+MAX_TAG_BYTES = 256 * 1024
+# text frames larger than this are not date or genre frames of a sane tag
+MAX_TEXT_FRAME = 1024
+# embedded artwork is only read from tags up to this size
+MAX_ARTWORK_BYTES = 16 * 1024 * 1024
+
+# date frames in order of preference, same as eyed3 getBestDate: original release, release, recording
+DATE_FRAMES = (
+    ("TDOR", "TORY", "TOR"),
+    ("TDRL",),
+    ("TDRC", "TYER", "TYE"),
+)
+DATE_PRIORITY = {frame_id: i for i, frame_ids in enumerate(DATE_FRAMES) for frame_id in frame_ids}
+GENRE_FRAMES = ("TCON", "TCO")
+PICTURE_FRAMES = ("APIC", "PIC")
+FRONT_COVER = 3
+
+TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+
+
+class UnsupportedTag(Exception):
+    """
+    The file has no ID3v2 tag or uses features that need the full eyed3 parser.
+    """
+
+
+class NoTag(UnsupportedTag):
+    pass
+
+
+def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_text(body):
+    if not body:
+        return ""
+    encoding = TEXT_ENCODINGS.get(body[0])
+    if encoding is None:
+        raise UnsupportedTag(f"unknown text encoding {body[0]}")
+    # multiple values of ID3v2.4 are separated by null characters, only the first is used
+    text = body[1:].decode(encoding, errors="replace")
+    return text.split("\x00")[0].strip()
+
+
+def _year(text):
+    year = text[:4]
+    if len(year) == 4 and year.isdigit():
+        return int(year)
+    return None
+
+
+def _genre(text):
+    # same representation as str(tag.genre) of eyed3, which is stored in the database, e.g. "(17)Rock"
+    if not text:
+        return None
+    genre = Genre.parse(text)
+    if genre is None:
+        return None
+    return str(genre)
+
+
+def iter_frames(fh, wanted, max_bytes=MAX_TAG_BYTES):
+    """
+    Yield (frame_id, body) of the frames of the ID3v2 tag of an open file for which wanted(frame_id, size) is true.
+    Other frames are skipped without reading them. Bodies which would exceed max_bytes read in total
+    are skipped as well, UnsupportedTag is raised if the frame headers alone exceed it.
+    """
+    header = fh.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        raise NoTag("no ID3v2 tag")
+    version, flags = header[3], header[5]
+    if version not in (2, 3, 4):
+        raise UnsupportedTag(f"ID3v2.{version}")
+    if version < 4 and flags & 0x80:
+        # unsynchronisation of the whole tag changes the frame offsets
+        raise UnsupportedTag("unsynchronised tag")
+    if version == 2 and flags & 0x40:
+        raise UnsupportedTag("compressed tag")
+    tag_end = 10 + _syncsafe(header[6:10])
+    position = 10
+    bytes_read = 10
+
+    if version > 2 and flags & 0x40:
+        extended = fh.read(4)
+        if version == 4:
+            size = _syncsafe(extended)
+        else:
+            size = struct.unpack(">I", extended)[0] + 4
+        fh.seek(size - 4, os.SEEK_CUR)
+        position += size
+        bytes_read += 4
+
+    if version == 2:
+        header_size, id_size = 6, 3
+    else:
+        header_size, id_size = 10, 4
+
+    while position + header_size <= tag_end:
+        if bytes_read + header_size > max_bytes:
+            raise UnsupportedTag("too many frames")
+        frame_header = fh.read(header_size)
+        bytes_read += header_size
+        if len(frame_header) < header_size or frame_header[0] == 0:
+            # end of file or padding
+            break
+        frame_id = frame_header[:id_size].decode("latin-1")
+        if version == 2:
+            size = int.from_bytes(frame_header[3:6], "big")
+            frame_flags = 0
+        elif version == 3:
+            size = struct.unpack(">I", frame_header[4:8])[0]
+            frame_flags = frame_header[9] & 0xE0
+        else:
+            size = _syncsafe(frame_header[4:8])
+            frame_flags = frame_header[9]
+        position += header_size + size
+
+        if position > tag_end or bytes_read + size > max_bytes or not wanted(frame_id, size):
+            fh.seek(size, os.SEEK_CUR)
+            continue
+        body = fh.read(size)
+        bytes_read += size
+        if version == 4:
+            if frame_flags & 0x0C:
+                # compressed or encrypted
+                raise UnsupportedTag(f"{frame_id} frame flags {frame_flags:#x}")
+            if frame_flags & 0x02:
+                body = body.replace(b"\xff\x00", b"\xff")
+            if frame_flags & 0x01:
+                # data length indicator
+                body = body[4:]
+            if frame_flags & 0x40:
+                # group identifier
+                body = body[1:]
+        elif frame_flags:
+            raise UnsupportedTag(f"{frame_id} frame flags {frame_flags:#x}")
+        yield frame_id, body
+
+
+def read_frames(fh, artwork=False):
+    """
+    Return dict of the date and genre frame texts of the ID3v2 tag of an open file
+    and the embedded picture data if artwork is True.
+    """
+    frames = {}
+    best_date = len(DATE_FRAMES)
+    # (picture type, data) of the preferred picture
+    picture = None
+
+    def wanted(frame_id, size):
+        if frame_id in PICTURE_FRAMES:
+            return artwork and (picture is None or picture[0] != FRONT_COVER)
+        if size > MAX_TEXT_FRAME:
+            return False
+        return frame_id in GENRE_FRAMES or DATE_PRIORITY.get(frame_id, best_date) < best_date
+
+    for frame_id, body in iter_frames(fh, wanted, MAX_ARTWORK_BYTES if artwork else MAX_TAG_BYTES):
+        if frame_id in PICTURE_FRAMES:
+            picture_type, data = _picture(frame_id, body)
+            if picture is None or picture_type == FRONT_COVER:
+                picture = (picture_type, data)
+            continue
+        frames[frame_id] = _decode_text(body)
+        if frame_id in DATE_PRIORITY and frames[frame_id]:
+            best_date = DATE_PRIORITY[frame_id]
+        complete = best_date == 0 and any(frames.get(genre_id) for genre_id in GENRE_FRAMES)
+        if complete and (not artwork or (picture is not None and picture[0] == FRONT_COVER)):
+            break
+    return frames, picture[1] if picture is not None else None
+
+
+def _picture(frame_id, body):
+    # (picture type, image data) of an APIC or ID3v2.2 PIC frame
+    encoding = body[0]
+    if frame_id == "PIC":
+        offset = 4
+    else:
+        offset = body.index(b"\x00", 1) + 1
+    picture_type = body[offset]
+    # null terminated description, two bytes wide for UTF-16
+    if encoding in (1, 2):
+        end = offset + 1
+        while body[end : end + 2] != b"\x00\x00":
+            end += 2
+            if end >= len(body):
+                raise ValueError("unterminated picture description")
+        offset = end + 2
+    else:
+        offset = body.index(b"\x00", offset + 1) + 1
+    return picture_type, body[offset:]
+
+
+def read_header_artwork(path):
+    """
+    Return the embedded front cover image of a track, other pictures if there is no front cover.
+    """
+    image = None
+    with open(path, "rb") as fh:
+        for frame_id, body in iter_frames(fh, lambda frame_id, size: frame_id in PICTURE_FRAMES, MAX_ARTWORK_BYTES):
+            picture_type, data = _picture(frame_id, body)
+            if picture_type == FRONT_COVER:
+                return data
+            if image is None:
+                image = data
+    return image
+
+
+def read_header_track(path, artwork=False):
+    """
+    Return (date, genre, image) from the ID3v2 tag only, raises UnsupportedTag if the tag can't be read this way.
+    """
+    with open(path, "rb") as fh:
+        frames, image = read_frames(fh, artwork)
+    date = 0
+    for frame_ids in DATE_FRAMES:
+        years = [_year(frames[frame_id]) for frame_id in frame_ids if frames.get(frame_id)]
+        years = [year for year in years if year is not None]
+        if years:
+            date = years[0]
+            break
+    genre = None
+    for frame_id in GENRE_FRAMES:
+        if frames.get(frame_id):
+            genre = _genre(frames[frame_id])
+            break
+    return date, genre, image
+
+
+def read_header_tags(path):
+    return read_header_track(path)[:2]
+
+
+def read_eyed3_tags(path):
+    rmp3 = eyed3.load(path)
+    if rmp3 is None or rmp3.tag is None:
+        # not an mp3 file or without any tag
+        return 0, None
+    date = rmp3.tag.getBestDate()
+    genre = rmp3.tag.genre
+    year = date.year if date is not None else None
+    return year or 0, str(genre) if genre is not None else None
+
+
+def read_tags(path):
+    """
+    Return (date, genre) of a track, date is the year or 0 if unknown.
+    """
+    try:
+        return read_header_tags(path)
+    except UnsupportedTag as error:
+        log.debug(f"Using eyed3 for {path}: {error}")
+    except (ValueError, IndexError, struct.error):
+        log.debug(f"Could not read ID3v2 header of {path}", exc_info=True)
+    return read_eyed3_tags(path)
+
+
+def read_track(path, artwork=False):
+    """
+    Return (date, genre, image) of a track with a single read of the tag, image is None
+    without artwork. Runs in the tag worker processes, so only these compact values are returned.
+    """
+    try:
+        return read_header_track(path, artwork)
+    except NoTag:
+        # ID3v1 tags have no pictures
+        return (*read_eyed3_tags(path), None)
+    except UnsupportedTag as error:
+        log.debug(f"Using eyed3 for {path}: {error}")
+    except (ValueError, IndexError, struct.error):
+        log.debug(f"Could not read ID3v2 header of {path}", exc_info=True)
+    date, genre = read_eyed3_tags(path)
+    image = read_artwork(path) if artwork else None
+    return date, genre, image
+
+
+def read_artwork(path):
+    """
+    Return the image data embedded in a track or None.
+    """
+    try:
+        return read_header_artwork(path)
+    except NoTag:
+        return None
+    except UnsupportedTag as error:
+        log.debug(f"Using eyed3 for {path}: {error}")
+    except (ValueError, IndexError, struct.error):
+        log.debug(f"Could not read ID3v2 artwork of {path}", exc_info=True)
+    rmp3 = eyed3.load(path)
+    if rmp3 is None or rmp3.tag is None or not rmp3.tag.images:
+        return None
+    images = sorted(rmp3.tag.images, key=lambda image: image.picture_type != FRONT_COVER)
+    return images[0].image_data
+
+
+class CountingRaw(io.RawIOBase):
+    """
+    Unbuffered file wrapper counting the bytes read from the file, used by the benchmark.
+    """
+
+    def __init__(self, raw, counter):
+        super().__init__()
+        self._raw = raw
+        self._counter = counter
+
+    @property
+    def name(self):
+        return self._raw.name
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._raw.readinto(buffer)
+        self._counter[0] += count or 0
+        return count
+
+    def seekable(self):
+        return self._raw.seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._raw.seek(offset, whence)
+
+    def tell(self):
+        return self._raw.tell()
+
+    def fileno(self):
+        return self._raw.fileno()
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def _measure(reader, path):
+    # returns (result, bytes read, seconds) with all bytes read from binary files counted,
+    # including the read ahead of the buffer
+    counter = [0]
+    real_open = builtins.open
+
+    def counting_open(file, mode="r", buffering=-1, *args, **kwargs):
+        if "b" not in mode or "r" not in mode or "+" in mode:
+            return real_open(file, mode, buffering, *args, **kwargs)
+        raw = CountingRaw(real_open(file, mode, 0, *args, **kwargs), counter)
+        if buffering == 0:
+            return raw
+        return io.BufferedReader(raw, buffering if buffering > 1 else io.DEFAULT_BUFFER_SIZE)
+
+    builtins.open = counting_open
+    try:
+        start = time.perf_counter()
+        try:
+            result = reader(path)
+        except Exception as error:
+            result = error
+        elapsed = time.perf_counter() - start
+    finally:
+        builtins.open = real_open
+    return result, counter[0], elapsed
+
+
+def benchmark(paths):
+    """
+    Compare bytes read and time per file of the header reader with eyed3.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files += [os.path.join(root, name) for name in sorted(names) if name.lower().endswith(".mp3")]
+        else:
+            files.append(path)
+    if not files:
+        print("No mp3 files found")
+        return
+
+    totals = {"header": [0, 0.0], "eyed3": [0, 0.0]}
+    differences = 0
+    for path in files:
+        header_result, header_bytes, header_time = _measure(read_tags, path)
+        eyed3_result, eyed3_bytes, eyed3_time = _measure(read_eyed3_tags, path)
+        totals["header"][0] += header_bytes
+        totals["header"][1] += header_time
+        totals["eyed3"][0] += eyed3_bytes
+        totals["eyed3"][1] += eyed3_time
+        if header_result != eyed3_result:
+            differences += 1
+            print(f"{path}: header {header_result!r} / eyed3 {eyed3_result!r}")
+
+    n = len(files)
+    print(f"{n} files, {differences} with different results")
+    print(f"{'reader':<8} {'bytes/file':>12} {'ms/file':>10}")
+    for name, (total_bytes, total_time) in totals.items():
+        print(f"{name:<8} {total_bytes / n:12.0f} {1000 * total_time / n:10.2f}")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:])
@@ -1,84 +1,563 @@
 """
-Worker class to download album art images.
+Worker class to collect album art images from the tracks, album folders or the Sonos speaker.
 """
 
 import logging as log
 import os
+import queue
 import threading
+import time
 import urllib
 
-import eyed3
+from collections import Counter
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 
-from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
 
-from . import BASE_PATH
+from . import BASE_PATH, http_pool, id3_reader
 from . import music_library as mdb
+from .library_sync import LibrarySync, RemoteAlbum
+from .scan_metrics import ScanMetrics
+from .scan_scheduler import ScanScheduler
 
-eyed3.log.setLevel("ERROR")
+# maximum edge length of the pre-scaled artwork for each icon size selectable in the GUI
+THUMBNAIL_SIZES = (150, 300, 500)
+# stages run for an album after the browse stage
+FULL_STAGES = ("tags", "artwork")
+
+
+def build_thumbnails(img_data):
+    """
+    Create the pre-scaled artwork for all icon size tiers, returns dict of tier to encoded image.
+    """
+    image = QImage()
+    if not img_data or not image.loadFromData(img_data):
+        return {}
+    if image.hasAlphaChannel():
+        fmt, quality = "PNG", -1
+    else:
+        fmt, quality = "JPG", 85
+    thumbnails = {}
+    for tier, size in enumerate(THUMBNAIL_SIZES):
+        if image.width() > size or image.height() > size:
+            scaled = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        else:
+            scaled = image
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        scaled.save(buffer, fmt, quality)
+        buffer.close()
+        thumbnails[tier] = bytes(data)
+    return thumbnails
+
+
+@dataclass
+class AlbumJob:
+    """
+    State of one album passing through the browse, tag and artwork stages of the scan.
+    """
+
+    ralbum: RemoteAlbum
+    uri: str = None
+    tracks: list = field(default_factory=list)
+    track_path: str = None
+    art_url: str = None
+    img_data: bytes = None
+    date: int = 0
+    genre: str = None
+    thumbnails: dict = field(default_factory=dict)
+    # name of the ArtworkSource the artwork was read from
+    art_source: str = None
+    # stages to run after the browse stage, only the failed ones for a retry
+    stages: tuple = FULL_STAGES
+    # number of stages still running after the browse stage
+    open_stages: int = 0
+    # error class name of each failed stage
+    failures: dict = field(default_factory=dict)
+    # embedded artwork read together with the tags by a worker process
+    embedded_art: bytes = None
+    embedded_read: bool = False
+
+
+def track_info(track):
+    # (track_number, title, duration, uri) of a soco music track as stored in the database
+    try:
+        duration = track.resources[0].duration
+    except (AttributeError, IndexError):
+        duration = None
+    return getattr(track, "original_track_number", None), track.title, duration, track.get_uri()
+
+
+class ArtworkSource:
+    """
+    One place to look for the artwork of an album, fetch returns the image data or None.
+    """
+
+    name = None
+
+    def fetch(self, job: AlbumJob):
+        raise NotImplementedError
+
+
+class EmbeddedArtwork(ArtworkSource):
+    name = "embedded"
+
+    def fetch(self, job):
+        if job.embedded_read:
+            return job.embedded_art
+        if job.track_path is None:
+            return None
+        return id3_reader.read_artwork(job.track_path)
+
+
+class FolderArtwork(ArtworkSource):
+    """
+    Cover image file next to the tracks of the album.
+    """
+
+    name = "folder"
+    FILE_NAMES = ("cover", "folder", "front", "albumart")
+    EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+    def fetch(self, job):
+        if job.track_path is None:
+            return None
+        folder = os.path.dirname(job.track_path)
+        # file names on the share may have any case
+        files = {name.lower(): name for name in os.listdir(folder)}
+        for file_name in self.FILE_NAMES:
+            for extension in self.EXTENSIONS:
+                if file_name + extension in files:
+                    with open(os.path.join(folder, files[file_name + extension]), "rb") as fh:
+                        return fh.read()
+        return None
+
+
+class SpeakerArtwork(ArtworkSource):
+    """
+    Artwork as resized by the Sonos speaker.
+    """
+
+    name = "speaker"
+
+    def fetch(self, job):
+        if job.art_url is None:
+            return None
+        return http_pool.fetch(job.art_url)
+
+
+# artwork sources in order of preference, the speaker is slow and only used if there is no local image
+ARTWORK_SOURCES = (EmbeddedArtwork(), FolderArtwork(), SpeakerArtwork())
 
 
 class LibraryImageBuilder(QThread):
-    def __init__(self, music_library, artists):
+    """
+    Synchronizes the local library with Sonos and collects the icon of each artist.
+
+    Albums that need to be fetched pass through bounded thread pools for the speaker
+    browse, the tag read and the artwork download, in the order given by the scheduler.
+    All database writes happen in this thread as the albums finish.
+    """
+
+    BROWSE_WORKERS = 4
+    TAG_WORKERS = 4
+    ARTWORK_WORKERS = 4
+    # seconds between live metrics updates
+    METRICS_INTERVAL = 1.0
+    # delay before the first retry of a failed stage, doubled with every attempt
+    RETRY_DELAY = 3600.0
+    MAX_ATTEMPTS = 8
+
+    def __init__(
+        self,
+        music_library,
+        artists,
+        browse_workers=None,
+        tag_workers=None,
+        artwork_workers=None,
+        artwork_sources=None,
+        tag_processes=None,
+        keep_icons=True,
+    ):
         super().__init__()
         self.music_library = music_library
         self.artists = artists
+        # the artist icons are only needed by the GUI, the headless indexer just reports progress
+        self.keep_icons = keep_icons
+        self.browse_workers = browse_workers or self.BROWSE_WORKERS
+        self.tag_workers = tag_workers or self.TAG_WORKERS
+        self.artwork_workers = artwork_workers or self.ARTWORK_WORKERS
+        self.artwork_sources = artwork_sources or ARTWORK_SOURCES
+        # number of processes to parse tags outside of the GUI interpreter, threads only if not set
+        self.tag_processes = tag_processes
+        self._tag_process_pool = None
+        self.art_source_counts = Counter()
+        self.metrics = ScanMetrics()
+        # hash of the newest artwork of each artist, the GUI loads the thumbnails of visible artists
         self.icon_data = {}
+        # artists with finished icon_data for the GUI to draw
+        self.ready_artists = queue.SimpleQueue()
+        self._artist_set = set(artists)
+        self.scheduler = ScanScheduler(artists)
+        self._retry_stages = {}
+        self._album_uris = {}
+        self._artist_locks = {}
+        self._lock = threading.Lock()
         try:
             self._empty_image = open(os.path.join(BASE_PATH, "icons", "no_artwork.png"), "rb").read()
         except Exception:
             self._empty_image = b""
+        self._empty_thumbnails = build_thumbnails(self._empty_image)
 
     def run(self):
         threading.current_thread().name = "AlbumArtThread"
         self.stop_thread = False
 
         mdb.connect_db()
-        music_library = self.music_library
+        self.writer = mdb.BatchWriter(metrics=self.metrics)
+        if self.tag_processes:
+            self._tag_process_pool = ProcessPoolExecutor(self.tag_processes)
+        try:
+            self.sync_library()
+        finally:
+            if self._tag_process_pool is not None:
+                self._tag_process_pool.shutdown(wait=False, cancel_futures=True)
+            self.writer.flush()
+            mdb.prune_artwork()
+            mdb.connections.close()
+            if self.metrics.stages:
+                self.scan_metrics.emit(self.metrics.snapshot())
+                log.info(self.metrics.summary())
+
+    def sync_library(self):
+        sync = LibrarySync(self.music_library)
+        plan = sync.plan()
+        if plan.artists is not None:
+            mdb.set_artists(plan.artists)
+            # artists added by the sync need icons as well, they are shown after the scan
+            added = [artist for artist in plan.artists if artist not in self._artist_set]
+            self.artists = self.artists + added
+            self._artist_set.update(added)
+        for artist, album in plan.removed:
+            self.writer.delete_album(artist, album)
+        for ralbum in plan.refresh:
+            self.writer.update_art_uri(ralbum.artist, ralbum.album, ralbum.art_uri)
+        self.writer.flush()
+        sync.checkpoint(plan)
+        self.build_missing_thumbnails()
+
+        self.collect_icons(plan.fetch)
+        if self.stop_thread:
+            return
+        sync.finish(plan)
+        # the library is usable now, failed albums are retried afterwards in the background
+        self.download_progress.emit(1.0)
+        self.retry_failures()
+
+    def collect_icons(self, ralbums):
         artists = self.artists
+        pending = {}
+        for ralbum in ralbums:
+            pending[ralbum.artist] = pending.get(ralbum.artist, 0) + 1
+        # finished artists with albums not yet written by the batch writer and the number of its batch
+        unwritten = []
+        finished = 0
 
-        # collect icons
-        for i, artist in enumerate(artists):
-            if self.stop_thread:
+        def icon_ready(artist):
+            self.icon_data[artist] = mdb.get_last_artwork(artist)
+            self.ready_artists.put(artist)
+
+        def written():
+            # the GUI reads the icons from the database
+            while unwritten and unwritten[0][0] < self.writer.batches:
+                icon_ready(unwritten.pop(0)[1])
+
+        def finish_artist(artist, stored=False):
+            nonlocal finished
+            if self.keep_icons and stored:
+                unwritten.append((self.writer.batches, artist))
+            elif self.keep_icons:
+                icon_ready(artist)
+            finished += 1
+            # 1.0 is only emitted once the whole sync has finished
+            self.download_progress.emit(min(finished / len(artists), 0.99))
+
+        for artist in artists:
+            if not pending.get(artist, 0):
+                finish_artist(artist)
+        self.scheduler.add(ralbums)
+        last_report = time.monotonic()
+        for job in self.fetch_albums():
+            artist = job.ralbum.artist
+            with self.metrics.measure("store"):
+                self.store_album(job)
+            if time.monotonic() - last_report > self.METRICS_INTERVAL:
+                last_report = time.monotonic()
+                self.scan_metrics.emit(self.metrics.snapshot())
+            pending[artist] -= 1
+            if pending[artist] == 0 and artist in self._artist_set:
+                finish_artist(artist, stored=True)
+            written()
+        self.writer.flush()
+        written()
+        if self.art_source_counts:
+            log.info(f"Artwork sources: {dict(self.art_source_counts)}")
+
+    def fetch_albums(self):
+        """
+        Run the albums of the scheduler through the stage pools and yield them as they finish.
+        """
+        if not self.scheduler:
+            return
+        results = queue.Queue()
+        browse_pool = ThreadPoolExecutor(self.browse_workers, "AlbumBrowse")
+        tag_pool = ThreadPoolExecutor(self.tag_workers, "AlbumTags")
+        artwork_pool = ThreadPoolExecutor(self.artwork_workers, "AlbumArtwork")
+
+        def stage_done(job):
+            with self._lock:
+                job.open_stages -= 1
+                finished = job.open_stages == 0
+            if finished:
+                results.put(job)
+
+        def run_stage(name, stage, job, next_stage=None):
+            try:
+                with self.metrics.measure(name):
+                    stage(job)
+            except Exception as error:
+                # the futures are not inspected, so unexpected errors are recorded as failure of the stage
+                self.metrics.error(name, error)
+                job.failures[name] = type(error).__name__
+                log.warning(f"Error in {name} stage of {job.ralbum.artist} | {job.ralbum.album}", exc_info=True)
+            finally:
+                if next_stage is not None:
+                    submit_stage(*next_stage, job)
+                stage_done(job)
+
+        def submit_stage(pool, name, stage, job, next_stage=None):
+            try:
+                pool.submit(run_stage, name, stage, job, next_stage)
+            except RuntimeError:
+                # pools are shut down after the scan was stopped
+                pass
+
+        def browse_done(job):
+            if job.track_path is None and job.art_url is None:
+                results.put(job)
+                return
+            job.open_stages = len(job.stages)
+            artwork_stage = (artwork_pool, "artwork", self.fetch_artwork)
+            if self._tag_process_pool is not None and job.stages == FULL_STAGES:
+                # the worker process reads the embedded artwork with the tags, the artwork stage runs afterwards
+                submit_stage(tag_pool, "tags", self.read_tags, job, artwork_stage)
                 return
-            last_date = -1
-            albums = music_library.get_albums_for_artist(artist.title)
-            for album in albums:
-                img_data, date = mdb.get_image(artist.title, album.title)
-                if img_data is None:
-                    genre = None
+            if "tags" in job.stages:
+                submit_stage(tag_pool, "tags", self.read_tags, job)
+            if "artwork" in job.stages:
+                submit_stage(*artwork_stage, job)
+
+        def browse(job):
+            try:
+                with self.metrics.measure("browse"):
+                    self.browse_album(job)
+            except Exception as error:
+                self.metrics.error("browse", error)
+                job.failures["browse"] = type(error).__name__
+                log.warning(f"Error in browse stage of {job.ralbum.artist} | {job.ralbum.album}", exc_info=True)
+            finally:
+                browse_done(job)
+
+        def submit_next():
+            ralbum = self.scheduler.pop()
+            if ralbum is None:
+                return 0
+            stages = self._retry_stages.pop((ralbum.artist, ralbum.album), FULL_STAGES)
+            browse_pool.submit(browse, AlbumJob(ralbum, stages=stages))
+            return 1
+
+        # only a few albums are handed to the pools at a time, so priority changes take effect quickly
+        in_flight = 0
+        try:
+            for _ in range(self.browse_workers + max(self.tag_workers, self.artwork_workers)):
+                in_flight += submit_next()
+            while in_flight:
+                job = None
+                while job is None:
+                    if self.stop_thread:
+                        return
                     try:
-                        rtrack = music_library.get_tracks_for_album(
-                            artist.title, album.title, full_album_art_uri=True
-                        ).pop()
-                        uri = rtrack.album_art_uri
-                        rtfile = rtrack.get_uri()
-                        if rtfile.startswith("x-file-cifs:"):
-                            rtpath = urllib.request.unquote(rtfile.split(":", 1)[1])
-                            rmp3 = eyed3.load(rtpath)
-                        else:
-                            date = 0
-                            img_data = self._empty_image
-                    except Exception:
-                        log.warning(f"Error getting track info for {rtpath}")
-                    else:
-                        try:
-                            date = int(str(rmp3.tag.getBestDate()))
-                            genre = str(rmp3.tag.genre)
-                        except (ValueError, AttributeError):
-                            log.warning(f"Tag error for {rtpath}")
-                            date = 0
-                        try:
-                            img_data = urllib.request.urlopen(uri).read()
-                        except Exception:
-                            log.warning(f"Could not fetch artwork for {artist.title} | {album.title}", exc_info=True)
-                            img_data = self._empty_image
-                    mdb.insert_image(artist.title, album.title, img_data, date, genre)
-                if date > last_date:
-                    self.icon_data[artist.title] = img_data
-                    last_date = date
-            self.download_progress.emit((i + 1) / len(artists))
+                        job = results.get(timeout=0.2)
+                    except queue.Empty:
+                        pass
+                in_flight += submit_next() - 1
+                yield job
+        finally:
+            for pool in (browse_pool, tag_pool, artwork_pool):
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def browse_album(self, job):
+        artist, album = job.ralbum.artist, job.ralbum.album
+        job.uri = self.album_uri(artist, album)
+        try:
+            rtracks = list(self.music_library.get_tracks_for_album(artist, album, full_album_art_uri=True))
+            job.tracks = [track_info(track) for track in rtracks]
+            rtrack = rtracks[-1]
+            rtfile = rtrack.get_uri()
+        except Exception as error:
+            self.metrics.error("browse", error)
+            job.failures["browse"] = type(error).__name__
+            log.warning(f"Error getting track info for {artist} | {album}")
+            return
+        if rtfile.startswith("x-file-cifs:"):
+            job.track_path = urllib.request.unquote(rtfile.split(":", 1)[1])
+            job.art_url = rtrack.album_art_uri
+        else:
+            job.img_data = self._empty_image
+            job.thumbnails = self._empty_thumbnails
+
+    def read_tags(self, job):
+        try:
+            if self._tag_process_pool is not None:
+                read_embedded = "artwork" in job.stages
+                future = self._tag_process_pool.submit(id3_reader.read_track, job.track_path, read_embedded)
+                job.date, job.genre, job.embedded_art = future.result()
+                job.embedded_read = read_embedded
+            else:
+                job.date, job.genre = id3_reader.read_tags(job.track_path)
+        except (OSError, BrokenExecutor) as error:
+            # the share or worker process may be available again later
+            self.metrics.error("tags", error)
+            job.failures["tags"] = type(error).__name__
+            log.warning(f"Could not read tags of {job.track_path}")
+            job.date = 0
+        except Exception as error:
+            # invalid tags are not retried, the album is stored without date
+            self.metrics.error("tags", error)
+            log.warning(f"Tag error for {job.track_path}")
+            job.date = 0
+
+    def fetch_artwork(self, job):
+        # the first source with a valid image wins
+        last_error = None
+        for source in self.artwork_sources:
+            try:
+                img_data = source.fetch(job)
+            except Exception as error:
+                last_error = error
+                self.metrics.error("artwork", f"{source.name} {type(error).__name__}")
+                log.warning(
+                    f"Could not read {source.name} artwork for {job.ralbum.artist} | {job.ralbum.album}", exc_info=True
+                )
+                continue
+            if not img_data:
+                continue
+            thumbnails = build_thumbnails(img_data)
+            if not thumbnails:
+                log.debug(f"Invalid {source.name} artwork for {job.ralbum.artist} | {job.ralbum.album}")
+                continue
+            job.img_data = img_data
+            job.thumbnails = thumbnails
+            job.art_source = source.name
+            return
+        if last_error is not None:
+            # no source had an image, but some could not be read and are retried later
+            job.failures["artwork"] = type(last_error).__name__
+        job.img_data = self._empty_image
+        job.thumbnails = self._empty_thumbnails
+
+    def store_album(self, job):
+        artist, album = job.ralbum.artist, job.ralbum.album
+        if job.stages != FULL_STAGES and "browse" in job.failures:
+            # the retried stages could not run, the stored values are kept and the stages stay due
+            for stage in job.stages:
+                self.writer.record_failure(artist, album, stage, job.failures["browse"], self.RETRY_DELAY)
+            return
+        if job.stages == FULL_STAGES:
+            self.writer.insert_image(
+                artist, album, job.img_data, job.date, job.genre, job.ralbum.art_uri, job.uri, job.art_source
+            )
+            self.writer.remove_scan_item(artist, album)
+            self.art_source_counts[job.art_source] += 1
+        else:
+            # retry of single stages, the stored values are only replaced by successful ones
+            if "tags" in job.stages and "tags" not in job.failures:
+                self.writer.update_tags(artist, album, job.date, job.genre)
+            if "artwork" in job.stages and "artwork" not in job.failures:
+                self.writer.update_artwork(artist, album, job.img_data, job.art_source)
+                self.art_source_counts[job.art_source] += 1
+            else:
+                job.thumbnails = {}
+        if job.tracks:
+            self.writer.insert_tracks(artist, album, job.tracks)
+        if job.thumbnails:
+            self.writer.insert_thumbnails(artist, album, job.thumbnails)
+        for stage in ("browse",) + job.stages:
+            if stage in job.failures:
+                self.writer.record_failure(artist, album, stage, job.failures[stage], self.RETRY_DELAY)
+            elif "browse" not in job.failures:
+                # the other stages did not run if the browse failed
+                self.writer.clear_failure(artist, album, stage)
+
+    def retry_failures(self):
+        """
+        Low priority pass over albums with failed stages that are due for a retry.
+        """
+        due = mdb.get_due_failures(self.MAX_ATTEMPTS)
+        if not due:
+            return
+        log.info(f"Retrying {len(due)} albums with failed scan stages")
+        ralbums = []
+        for artist, album, art_uri, failed in due:
+            if "browse" not in failed:
+                self._retry_stages[(artist, album)] = tuple(stage for stage in FULL_STAGES if stage in failed)
+            ralbums.append(RemoteAlbum(artist, album, art_uri))
+        self.scheduler.add(ralbums)
+        artists = set()
+        for job in self.fetch_albums():
+            with self.metrics.measure("store"):
+                self.store_album(job)
+            artists.add(job.ralbum.artist)
+        self.writer.flush()
+        # icons of artists with healed artwork
+        if not self.keep_icons:
+            return
+        for artist in artists & self._artist_set:
+            self.icon_data[artist] = mdb.get_last_artwork(artist)
+            self.ready_artists.put(artist)
+
+    def album_uri(self, artist, album):
+        # the album items of an artist are browsed once for all its albums that need to be fetched
+        with self._lock:
+            artist_lock = self._artist_locks.setdefault(artist, threading.Lock())
+        with artist_lock:
+            if artist not in self._album_uris:
+                try:
+                    self._album_uris[artist] = {
+                        item.title: item.get_uri() for item in self.music_library.get_albums_for_artist(artist)
+                    }
+                except Exception as error:
+                    self.metrics.error("browse", error)
+                    log.warning(f"Could not get albums of {artist}", exc_info=True)
+                    self._album_uris[artist] = {}
+        return self._album_uris[artist].get(album, None)
+
+    def build_missing_thumbnails(self):
+        # artwork stored before the thumbnail support
+        for artwork_hash in mdb.get_missing_thumbnails(len(THUMBNAIL_SIZES)):
+            if self.stop_thread:
+                return
+            thumbnails = build_thumbnails(mdb.get_artwork(artwork_hash))
+            if thumbnails:
+                self.writer.insert_artwork_thumbnails(artwork_hash, thumbnails)
+        self.writer.flush()
 
     download_progress = pyqtSignal(float)
+    # dict of stage name to StageStats, emitted during the scan and at the end
+    scan_metrics = pyqtSignal(object)
 
     def quit(self):
         self.stop_thread = True
@@ -0,0 +1,67 @@
+"""
+Decode and scale artwork on a thread pool, so the GUI thread only wraps finished images.
+"""
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QRunnable, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+
+def decode_image(data, size=None):
+    """
+    Return the image in data fitted into a size x size box, a null image if it can't be decoded.
+
+    The scaled size is set before reading, so JPEGs are decoded at reduced resolution.
+    """
+    if not data:
+        return QImage()
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    if size is not None:
+        original = reader.size()
+        if original.isValid():
+            reader.setScaledSize(original.scaled(size, size, Qt.KeepAspectRatio))
+    image = reader.read()
+    buffer.close()
+    return image
+
+
+class DecodeTask(QRunnable):
+    def __init__(self, decoder, key, data, size):
+        super().__init__()
+        self.decoder = decoder
+        self.key = key
+        self.data = data
+        self.size = size
+
+    def run(self):
+        # data can also be a function reading the image, e.g. from the network
+        data = self.data() if callable(self.data) else self.data
+        self.decoder.image_ready.emit(self.key, decode_image(data, self.size))
+
+
+class ImageDecoder(QObject):
+    """
+    Decode requests are identified by a key chosen by the caller, which is passed back with the
+    image through the image_ready signal in the thread of the receiver. The image data is given
+    as bytes or as a function returning them, which is called in the pool.
+    """
+
+    image_ready = pyqtSignal(object, QImage)
+
+    def __init__(self, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads is not None:
+            self.pool.setMaxThreadCount(max_threads)
+
+    def request(self, key, data, size=None, priority=0):
+        self.pool.start(DecodeTask(self, key, data, size), priority)
+
+    def clear(self):
+        # drop all requests not yet started
+        self.pool.clear()
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
@@ -0,0 +1,204 @@
+"""
+Build the local music library database without starting the GUI.
+
+    python -m slb.indexer --speaker 192.168.1.20
+    python -m slb.indexer --fixture library.json --database test_library.db
+
+The scan is the same as the one of the GUI, so the GUI starts with a warm database
+afterwards. A fixture is a JSON recording of a Sonos library, made with
+--speaker and --record, to build the database without access to a speaker.
+"""
+
+import argparse
+import json
+import logging
+import logging as log
+import sys
+import time
+
+from types import SimpleNamespace
+
+import soco
+
+from . import music_library as mdb
+from .image_builder import LibraryImageBuilder
+
+
+class FixtureItem:
+    """
+    Album, artist or track item of a recorded library with the attributes of the soco items used by the scan.
+    """
+
+    def __init__(self, title, uri=None, creator=None, album_art_uri=None, track_number=None, duration=None):
+        self.title = title
+        self.creator = creator
+        self.album_art_uri = album_art_uri
+        self.original_track_number = track_number
+        self.resources = [SimpleNamespace(duration=duration)]
+        self._uri = uri
+
+    def get_uri(self):
+        return self._uri
+
+
+class FixtureLibrary:
+    """
+    Replays a recorded library with the soco MusicLibrary methods used by the scan.
+    """
+
+    def __init__(self, data):
+        self.update_id = data.get("update_id")
+        self.artists = data["artists"]
+        self.albums = data["albums"]
+        self.contentDirectory = self
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as fh:
+            return cls(json.load(fh))
+
+    def GetSystemUpdateID(self):
+        return {"Id": self.update_id}
+
+    def get_album_artists(self, complete_result=True):
+        return [FixtureItem(artist) for artist in self.artists]
+
+    def _album_item(self, album):
+        return FixtureItem(album["album"], album.get("uri"), album["artist"], album.get("art_uri"))
+
+    def get_music_library_information(self, search_type, complete_result=True):
+        if search_type != "albums":
+            raise ValueError(f"Fixture only contains albums, not {search_type}")
+        return [self._album_item(album) for album in self.albums]
+
+    def get_albums_for_artist(self, artist):
+        return [self._album_item(album) for album in self.albums if album["artist"] == artist]
+
+    def get_tracks_for_album(self, artist, album, full_album_art_uri=False):
+        for item in self.albums:
+            if item["artist"] == artist and item["album"] == album:
+                return [
+                    FixtureItem(
+                        track["title"],
+                        track["uri"],
+                        artist,
+                        track.get("album_art_uri"),
+                        track.get("track_number"),
+                        track.get("duration"),
+                    )
+                    for track in item["tracks"]
+                ]
+        return []
+
+
+def record_fixture(music_library, path):
+    """
+    Write the albums and tracks of a Sonos library to a JSON fixture.
+    """
+    update_id = str(music_library.contentDirectory.GetSystemUpdateID()["Id"])
+    artists = [item.title for item in music_library.get_album_artists(complete_result=True)]
+    albums = []
+    for item in music_library.get_music_library_information("albums", complete_result=True):
+        artist = getattr(item, "creator", None)
+        if not artist:
+            continue
+        tracks = []
+        for track in music_library.get_tracks_for_album(artist, item.title, full_album_art_uri=True):
+            try:
+                duration = track.resources[0].duration
+            except (AttributeError, IndexError):
+                duration = None
+            tracks.append(
+                dict(
+                    title=track.title,
+                    uri=track.get_uri(),
+                    album_art_uri=getattr(track, "album_art_uri", None),
+                    track_number=getattr(track, "original_track_number", None),
+                    duration=duration,
+                )
+            )
+        albums.append(
+            dict(
+                artist=artist,
+                album=item.title,
+                uri=item.get_uri(),
+                art_uri=getattr(item, "album_art_uri", None),
+                tracks=tracks,
+            )
+        )
+        if len(albums) % 100 == 0:
+            log.info(f"recorded {len(albums)} albums")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(dict(update_id=update_id, artists=artists, albums=albums), fh, indent=1)
+    log.info(f"recorded {len(artists)} artists and {len(albums)} albums to {path}")
+
+
+def build_database(music_library, **options):
+    """
+    Run the library scan in the current thread and return the finished builder.
+    """
+    mdb.connect_db()
+    artists = mdb.get_artist_names()
+    if not artists:
+        artists = [item.title for item in music_library.get_album_artists(complete_result=True)]
+    builder = LibraryImageBuilder(music_library, sorted(artists), keep_icons=False, **options)
+    last_report = [0.0]
+
+    def report_progress(progress):
+        if progress >= last_report[0] + 0.1 or progress == 1.0:
+            last_report[0] = progress
+            log.info(f"{100 * progress:.0f}% of artists finished")
+
+    builder.download_progress.connect(report_progress)
+    builder.run()
+    return builder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m slb.indexer", description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--speaker", help="IP address of a Sonos speaker")
+    source.add_argument("--fixture", help="JSON recording of a library to index instead of a speaker")
+    parser.add_argument("--database", default=mdb.DB_PATH, help="database file, default %(default)s")
+    parser.add_argument("--record", metavar="FIXTURE", help="record the library of the speaker instead of indexing")
+    parser.add_argument("--browse-workers", type=int)
+    parser.add_argument("--tag-workers", type=int)
+    parser.add_argument("--artwork-workers", type=int)
+    parser.add_argument("--tag-processes", type=int, help="parse tags in worker processes")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(levelname) 7s: %(message)s"
+    )
+    if args.speaker:
+        music_library = soco.SoCo(args.speaker).music_library
+    else:
+        music_library = FixtureLibrary.load(args.fixture)
+    if args.record:
+        if args.fixture:
+            parser.error("--record needs --speaker")
+        record_fixture(music_library, args.record)
+        return 0
+
+    mdb.connections = mdb.ConnectionManager(args.database)
+    options = dict(
+        browse_workers=args.browse_workers,
+        tag_workers=args.tag_workers,
+        artwork_workers=args.artwork_workers,
+        tag_processes=args.tag_processes,
+    )
+    start = time.monotonic()
+    builder = build_database(music_library, **options)
+    elapsed = time.monotonic() - start
+
+    # stage metrics and artwork sources are logged by the builder
+    mdb.connect_db()
+    errors = sum(stats.error_count for stats in builder.metrics.snapshot().values())
+    print(f"Indexed {args.database} in {elapsed:.1f}s")
+    print(f"{mdb.get_num_albums()} albums of {len(mdb.get_artist_names())} artists, {errors} scan errors")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
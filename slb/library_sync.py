@@ -0,0 +1,105 @@
+"""
+Compare the Sonos music library with the local database to find added, removed and changed albums.
+
+The album list is only requested from the speaker if the library update id of the
+speaker changed since the last completed sync, so a warm start needs a single request.
+Albums still to be fetched are checkpointed in the database, an interrupted scan
+continues with them if the library did not change in between.
+"""
+
+import logging as log
+import time
+
+from dataclasses import dataclass, field
+
+from . import music_library as mdb
+
+
+@dataclass
+class RemoteAlbum:
+    artist: str
+    album: str
+    art_uri: str
+
+
+@dataclass
+class SyncPlan:
+    update_id: str = None
+    # albums that are new or have changed in the Sonos library
+    fetch: list[RemoteAlbum] = field(default_factory=list)
+    removed: list[tuple[str, str]] = field(default_factory=list)
+    # albums stored by older versions without artwork uri, only the uri needs to be stored
+    refresh: list[RemoteAlbum] = field(default_factory=list)
+    # full artist list of the library, None if unchanged
+    artists: list[str] = None
+    # fetch list restored from the checkpoint of an interrupted scan
+    resumed: bool = False
+
+
+class LibrarySync:
+    def __init__(self, music_library):
+        self.music_library = music_library
+
+    def get_update_id(self):
+        try:
+            return str(self.music_library.contentDirectory.GetSystemUpdateID()["Id"])
+        except Exception:
+            log.warning("Could not read library update id from Sonos", exc_info=True)
+            return None
+
+    def get_remote_artists(self):
+        return [item.title for item in self.music_library.get_album_artists(complete_result=True)]
+
+    def get_remote_albums(self):
+        # the album list is paged in with a few large requests instead of one browse per artist
+        albums = {}
+        for item in self.music_library.get_music_library_information("albums", complete_result=True):
+            artist = getattr(item, "creator", None)
+            if not artist:
+                continue
+            albums[(artist, item.title)] = RemoteAlbum(artist, item.title, getattr(item, "album_art_uri", None))
+        return albums
+
+    def plan(self) -> SyncPlan:
+        update_id = self.get_update_id()
+        plan = SyncPlan(update_id)
+        if update_id is not None and update_id == mdb.get_sync_state("update_id") and mdb.get_num_albums() > 0:
+            log.info("Local music library is up to date")
+            return plan
+        if update_id is not None and update_id == mdb.get_sync_state("scan_update_id"):
+            # the library did not change since the interrupted scan, removals were already applied
+            plan.fetch = [RemoteAlbum(*row) for row in mdb.get_scan_queue()]
+            if plan.fetch:
+                plan.resumed = True
+                log.info(f"Resuming library scan with {len(plan.fetch)} albums left")
+                return plan
+
+        plan.artists = self.get_remote_artists()
+        remote = self.get_remote_albums()
+        local = mdb.get_album_fingerprints()
+        for key, ralbum in remote.items():
+            if key not in local:
+                plan.fetch.append(ralbum)
+            elif local[key] != ralbum.art_uri:
+                if local[key] is None:
+                    plan.refresh.append(ralbum)
+                else:
+                    plan.fetch.append(ralbum)
+        plan.removed = [key for key in local if key not in remote]
+        log.info(
+            f"Library sync: {len(plan.fetch)} new or changed, {len(plan.removed)} removed, "
+            f"{len(plan.refresh)} refreshed albums"
+        )
+        return plan
+
+    def checkpoint(self, plan: SyncPlan):
+        # store the albums to fetch, they are removed from the checkpoint as they are written
+        if not plan.resumed:
+            mdb.set_scan_queue(plan.update_id, [(r.artist, r.album, r.art_uri) for r in plan.fetch])
+
+    def finish(self, plan: SyncPlan):
+        # only called after all changes have been written, an interrupted sync resumes from the checkpoint
+        mdb.clear_scan_queue()
+        if plan.update_id is not None:
+            mdb.set_sync_state("update_id", plan.update_id)
+        mdb.set_sync_state("last_sync", str(time.time()))
@@ -4,15 +4,22 @@ The central main window class for the GUI.
 import logging
 import logging as log
 import os
-import urllib
+
+from functools import partial
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
-from . import BASE_PATH, main_interface
+from . import BASE_PATH, http_pool, main_interface
 from . import music_library as mdb
+from .album_scenes import AlbumLoader, AlbumScene, AlbumSceneCache
+from .artist_filter import ArtistFilter, filter_artists
+from .artist_grid import ArtistGrid
+from .artist_index import ArtistIndex
 from .custom_logging import QtLogger
 from .data_model import SonosGroup, SonosSpeaker, SonosSystem
 from .image_builder import LibraryImageBuilder
+from .image_decoder import ImageDecoder
+from .pixmap_cache import PixmapCache
 from .soco_event_thread import SocoEventThread
 from .sonos_connector import SonosConnector
 
@@ -22,14 +29,33 @@ class GUIWindow(QtWidgets.QMainWindow):
     ITEMS_PER_ROW = 10
     ALBUMS_PER_ROW = 6
     ITEM_SCALE = 10
+    ICON_TIER = 0
     MARGIN = 5
+    QUEUE_ICON_SIZE = 32
+    # ms the pointer rests on an artist before the album scene is prepared
+    HOVER_DELAY = 150
     _last_selected_track = ""
-    _changed_label = None
+    _shown_artist = None
+    _playing_art = None
+    _playing_key = None
+    _image_requests = 0
+    _hovered_artist = None
+    _album_scene = None
 
     def __init__(self):
         super().__init__()
-        self.image_cache = {}
+        # request number of the images being decoded by cache key
+        self._pending_images = {}
+        # artists waiting for the placeholder icon to be decoded
+        self._placeholder_artists = set()
+        self.image_decoder = ImageDecoder()
+        self.image_decoder.image_ready.connect(self.image_decoded)
+        try:
+            self._empty_artwork = open(os.path.join(BASE_PATH, "icons", "no_artwork.png"), "rb").read()
+        except Exception:
+            self._empty_artwork = b""
         self._library_artwork = None
+        self.artist_index = None
 
         self.ui = main_interface.Ui_MainWindow()
         self.ui.setupUi(self)
@@ -41,8 +67,31 @@ class GUIWindow(QtWidgets.QMainWindow):
 
         self.ui.libraryView.key_press_forward.connect(self.ui.artistFilter.keyPressEvent)
         self.ui.libraryView.key_release_forward.connect(self.ui.artistFilter.keyReleaseEvent)
+        self.ui.libraryView.verticalScrollBar().valueChanged.connect(self.update_visible_artists)
+
+        # only the artists near the viewport get scene items
+        self.artist_grid = ArtistGrid(self.ui.libraryView, self)
+        self.artist_grid.tiles_shown.connect(self.build_artist_icons)
+        self.artist_grid.scene.mouseReleaseEvent = self.selection_changed
+        self.artist_grid.scene.mouseMoveEvent = self.hover_album
+        # filtering while typing runs in the background, the tiles are updated with the result
+        self.artist_filter = ArtistFilter(self)
+        self.artist_filter.artists_filtered.connect(self.show_artists)
+        # album scenes of recently opened artists and of the artist below the pointer
+        self.album_scenes = AlbumSceneCache()
+        self.album_loader = AlbumLoader(self)
+        self.album_loader.albums_loaded.connect(self.albums_loaded)
+        self._hover_timer = QtCore.QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.timeout.connect(self.prefetch_album)
 
         self.settings = QtCore.QSettings("Artur Glavic", "Sonos Library Browser")
+        # memory for decoded artwork in MB can be set in the settings
+        if self.settings.value("mainWindow/pixmap_cache_mb") is not None:
+            self.pixmap_cache = PixmapCache(int(self.settings.value("mainWindow/pixmap_cache_mb")) * 1024 * 1024)
+        else:
+            self.pixmap_cache = PixmapCache()
+        self.ui.groupQueueList.setIconSize(QtCore.QSize(self.QUEUE_ICON_SIZE, self.QUEUE_ICON_SIZE))
         self.load_settings()
 
         self.extend_toolbar()
@@ -130,64 +179,64 @@ class GUIWindow(QtWidgets.QMainWindow):
         self.update_playing_info()
 
     def filter_artists(self):
-        self.build_library()
+        if self.artist_index is None:
+            self.load_artists()
+        self.artist_filter.request(self.artist_index, *self.filter_settings())
+
+    @QtCore.pyqtSlot(list)
+    def show_artists(self, artists):
+        self.ui.libraryView.setScene(self.artist_grid.scene)
+        self.artist_grid.set_artists(artists, scroll_to_top=True)
+        self.update_visible_artists()
+
+    def load_artists(self):
+        artists = mdb.get_artist_names()
+        if not artists:
+            # first start, the list is kept up to date by the library sync afterwards
+            music_library = self.system.speakers[0].reference.music_library
+            artists = [a.title for a in music_library.get_album_artists(complete_result=True)]
+            mdb.set_artists(artists)
+        self.artist_index = ArtistIndex(artists)
+
+    def filter_settings(self):
+        # filter text and genre, None for all genres
+        genre = self.ui.genreFilter.currentText()
+        return str(self.ui.artistFilter.text()).strip().lower(), None if genre == "All Genres" else genre
 
     def filtered_artists(self):
-        artist_filter = str(self.ui.artistFilter.text()).strip().lower()
-        music_library = self.system.speakers[0].reference.music_library
-        if len(artist_filter) == 1:
-            artists = [
-                a for a in music_library.get_album_artists(max_items=1000) if a.title.lower().startswith(artist_filter)
-            ]
-        else:
-            artists = [a for a in music_library.get_album_artists(max_items=1000) if artist_filter in a.title.lower()]
-        if self.ui.genreFilter.currentText() != "All Genres":
-            filtered_artists = mdb.get_artists(self.ui.genreFilter.currentText())
-            artists = [a for a in artists if a.title in filtered_artists]
-        artists.sort(key=lambda a: a.title)
-        return artists
+        if self.artist_index is None:
+            self.load_artists()
+        return filter_artists(self.artist_index, *self.filter_settings())
 
     def build_library(self):
         music_library = self.system.speakers[0].reference.music_library
         artists = self.filtered_artists()
-        self._changed_label = None
-
-        scene = QtWidgets.QGraphicsScene(
-            0,
-            0,
-            self.ui.libraryView.FULL_LIBRARY_WIDTH,
-            self.ITEM_SCALE * ((len(artists) - 1) // self.ITEMS_PER_ROW + 1),
-        )
 
-        # text labels
-        self._artist_labels = {}
-        for i, artist in enumerate(artists):
-            label = QtWidgets.QGraphicsTextItem()
-            label.setHtml(f'<div style="background: rgba(255, 255, 255, 200);"><center>{artist.title}</center></div>')
-            label.setPos(self.ITEM_SCALE * (i % self.ITEMS_PER_ROW), self.ITEM_SCALE * (i // self.ITEMS_PER_ROW))
-            label.setTextWidth(self.ITEM_SCALE - 2 * self.MARGIN)
-            label.setData(QtCore.Qt.UserRole, artist.title)
-            label.setZValue(5.0)
-            scene.addItem(label)
-            self._artist_labels[artist.title] = label
-
-        self.ui.libraryView.setScene(scene)
-        scene.mouseReleaseEvent = self.selection_changed
-        scene.mouseMoveEvent = self.hover_album
-        self.album_scene = scene
+        grid = self.artist_grid
+        self.ui.libraryView.setScene(grid.scene)
+        if (grid.item_scale, grid.items_per_row) != (self.ITEM_SCALE, self.ITEMS_PER_ROW):
+            grid.set_layout(self.ITEM_SCALE, self.ITEMS_PER_ROW, self.MARGIN)
 
         if self._library_artwork is None:
             self.block_library()
-            self._last_progress = 0.0
             self.progress_bar.setStatusTip("Loading Albums")
             self.ui.libraryView.verticalScrollBar().setValue(1)
 
-            self._thread = LibraryImageBuilder(music_library, artists)
+            # number of parallel workers for each scan stage and of tag parsing processes can be set in the settings
+            workers = {}
+            for key in ("browse_workers", "tag_workers", "artwork_workers", "tag_processes"):
+                if self.settings.value(f"libraryScan/{key}") is not None:
+                    workers[key] = int(self.settings.value(f"libraryScan/{key}"))
+            self._thread = LibraryImageBuilder(music_library, artists, **workers)
             self._thread.download_progress.connect(self.update_download)
+            self._thread.finished.connect(self.library_scan_finished)
+            self._thread.scan_metrics.connect(self.update_scan_metrics)
             self._library_artwork = self._thread.icon_data
+            grid.set_artists(artists)
+            self.update_visible_artists()
             self._thread.start()
         else:
-            self.build_artist_icons()
+            grid.set_artists(artists)
 
     def block_library(self):
         self.ui.libraryView.blockSignals(True)
@@ -199,15 +248,57 @@ class GUIWindow(QtWidgets.QMainWindow):
         self.ui.artistFilter.blockSignals(False)
         self.ui.iconSizeBox.blockSignals(False)
 
+    def scan_running(self):
+        return isinstance(getattr(self, "_thread", None), LibraryImageBuilder)
+
+    def update_visible_artists(self):
+        # the library scan fetches the albums of the artists on screen first
+        if not self.scan_running() or self.ui.libraryView.scene() is not self.artist_grid.scene:
+            return
+        self._thread.scheduler.set_visible(self.artist_grid.visible_artists())
+
+    def draw_ready_artists(self):
+        # icons of the artists finished by the library scan since the last call
+        artists = []
+        while not self._thread.ready_artists.empty():
+            artists.append(self._thread.ready_artists.get())
+        if not artists:
+            return
+        for artist in artists:
+            self.forget_artist_images(artist)
+            self.album_scenes.remove(artist)
+            self.album_loader.invalidate(artist)
+        self.build_artist_icons(artists)
+        if self._shown_artist in artists:
+            # update the opened album view with the albums fetched in the meantime
+            self.show_album(self._shown_artist)
+
+    @QtCore.pyqtSlot()
+    def library_scan_finished(self):
+        if not self.scan_running():
+            return
+        # icons of the albums healed by the retry pass
+        self.draw_ready_artists()
+        self._thread.wait()
+        del self._thread
+
+    @QtCore.pyqtSlot(object)
+    def update_scan_metrics(self, metrics):
+        # throughput of each scan stage as tooltip of the progress bar
+        lines = [
+            f"{stage}: {stats.count} albums, {stats.items_per_second:.1f}/s, "
+            f"{1000 * stats.mean:.0f} ms, {stats.error_count} errors"
+            for stage, stats in metrics.items()
+        ]
+        self.progress_bar.setToolTip("\n".join(lines))
+
     @QtCore.pyqtSlot(float)
     def update_download(self, progress):
         self.progress_bar.setValue(int(progress * 100))
 
+        self.draw_ready_artists()
         if progress == 1.0:
-            self.build_artist_icons(display_range=(self._last_progress, 1.1))
-            self._thread.wait()
-            del self._thread
-            mdb.connect_db()
+            # the scan thread keeps retrying failed albums until library_scan_finished
             self.unblock_library()
             genres=list(sorted(mdb.get_genre_list()))
             for genre in genres:
@@ -217,63 +308,135 @@ class GUIWindow(QtWidgets.QMainWindow):
             self.ui.randomPoolsWidget.load_settings(self.settings)
             self.ui.randomPoolsWidget.append_random_album.connect(self.append_album)
             self.progress_bar.setValue(0)
-        elif progress > (self._last_progress + 0.1):
-            self.build_artist_icons(display_range=(self._last_progress, progress))
-            self._last_progress = progress
 
-    def build_artist_icons(self, display_range=None):
-        scene: QtWidgets.QGraphicsScene = self.ui.libraryView.scene()
+            artists = mdb.get_artist_names()
+            if set(artists) != set(self.artist_index.artists):
+                # the sync found added or removed artists
+                self.artist_index = ArtistIndex(artists)
+                self.build_library()
+
+    @QtCore.pyqtSlot(list)
+    def build_artist_icons(self, artists):
+        # icons of the given artists with a tile in the library view, decoded in the background
         img_scale = int(self.ITEM_SCALE - 2 * self.MARGIN)
-        try:
+
+        for artist in artists:
+            if self.artist_grid.tile(artist) is None:
+                continue
+            if self.scan_running() and artist not in self._library_artwork:
+                # not yet finished by the library scan
+                continue
+            artwork_hash = self._library_artwork.get(artist)
+            if artwork_hash:
+                # only the hash of each artist's artwork is kept, the thumbnail is read by the decoder pool
+                pixmap = self.request_pixmap(
+                    (artist, None, img_scale), lambda: partial(mdb.get_artwork_thumbnail, artwork_hash, self.ICON_TIER)
+                )
+            else:
+                # placeholder, shared by all artists without artwork
+                pixmap = self.request_pixmap((None, None, img_scale), lambda: self._empty_artwork)
+                if pixmap is None:
+                    self._placeholder_artists.add(artist)
+            if pixmap is not None:
+                self.artist_grid.set_icon(artist, pixmap)
+
+    def request_pixmap(self, key, load):
+        """
+        Return the cached pixmap for key, otherwise decode the image data returned by load in the background
+        and return None. The pixmap is shown by show_pixmap once it is decoded.
+        """
+        pixmap = self.pixmap_cache.get(key)
+        if pixmap is not None or key in self._pending_images:
+            return pixmap
+        data = load()
+        if not data:
             pixmap = QtGui.QPixmap()
-            pixmap.loadFromData(open(os.path.join(BASE_PATH, "icons", "no_artwork.png"), "rb").read())
-        except Exception:
-            std_icon = self.style().standardIcon(QtWidgets.QStyle.SP_FileIcon)
-            std_pixmap = std_icon.pixmap(img_scale, img_scale)
+            self.pixmap_cache.put(key, pixmap)
+            return pixmap
+        self._image_requests += 1
+        self._pending_images[key] = self._image_requests
+        self.image_decoder.request((self._image_requests, key), data, key[2])
+        return None
+
+    def forget_artist_images(self, artist):
+        # artwork of the artist changed, decodes still running are ignored
+        self.pixmap_cache.remove_artist(artist)
+        for key in [key for key in self._pending_images if key[0] == artist]:
+            del self._pending_images[key]
+
+    @QtCore.pyqtSlot(object, QtGui.QImage)
+    def image_decoded(self, request, image):
+        number, key = request
+        if self._pending_images.get(key) != number:
+            # artwork was changed by the library scan in the meantime
+            return
+        del self._pending_images[key]
+        artist, album, size = key
+        if image.isNull() and artist is not None and album is None:
+            # artwork without valid image
+            pixmap = self.style().standardIcon(QtWidgets.QStyle.SP_FileIcon).pixmap(size, size)
         else:
-            std_pixmap = pixmap.scaled(img_scale, img_scale, aspectRatioMode=QtCore.Qt.KeepAspectRatio)
-
-        artists = self.filtered_artists()
-
-        # build images
-        for i, artist in enumerate(artists):
-            if display_range is not None:
-                progress = (1 + i) / len(artists)
-                if progress < display_range[0]:
-                    continue
-                elif progress > display_range[1]:
-                    break
-            if artist.title in self._library_artwork and self._library_artwork[artist.title]:
-                pixmap = QtGui.QPixmap()
-                pixmap.loadFromData(self._library_artwork[artist.title])
-                pixmap = pixmap.scaled(img_scale, img_scale, aspectRatioMode=QtCore.Qt.KeepAspectRatio)
+            pixmap = QtGui.QPixmap.fromImage(image)
+        self.pixmap_cache.put(key, pixmap)
+        self.show_pixmap(key, pixmap)
+
+    def show_pixmap(self, key, pixmap):
+        artist, album, size = key
+        if album is None and size == int(self.ITEM_SCALE - 2 * self.MARGIN):
+            if artist is None:
+                # the placeholder was decoded
+                artists, self._placeholder_artists = self._placeholder_artists, set()
+                self.build_artist_icons(list(artists))
             else:
-                pixmap = std_pixmap
-
-            item = QtWidgets.QGraphicsPixmapItem()
-            item.setPixmap(pixmap)
-            item.setPos(
-                self.ITEM_SCALE * (i % self.ITEMS_PER_ROW), self.ITEM_SCALE * (i // self.ITEMS_PER_ROW) + self.MARGIN
-            )
-            item.setData(QtCore.Qt.UserRole, artist.title)
-
-            scene.addItem(item)
+                self.artist_grid.set_icon(artist, pixmap)
+        elif self.album_scenes.peek(artist) is not None:
+            album_scene = self.album_scenes.peek(artist)
+            if size == album_scene.icon_size and album in album_scene.icons:
+                album_scene.icons[album].setPixmap(pixmap)
+        if key == self._playing_key:
+            self.ui.NowPlayingArt.setPixmap(pixmap)
+        if size == self.QUEUE_ICON_SIZE:
+            for i in range(self.ui.groupQueueList.count()):
+                item = self.ui.groupQueueList.item(i)
+                if item.data(QtCore.Qt.UserRole) == (artist, album):
+                    item.setIcon(QtGui.QIcon(pixmap))
 
     def selection_changed(self, event: QtWidgets.QGraphicsSceneMouseEvent):
-        if self.ui.libraryView.signalsBlocked():
+        if self.ui.libraryView.signalsBlocked() and not self.scan_running():
             # ignore event if signals are blocked
             return
-        scene: QtWidgets.QGraphicsScene = self.ui.libraryView.scene()
-        trans = self.ui.libraryView.transform()
-        item = scene.itemAt(event.scenePos(), trans)
-        if item is None:
+        artist = self.artist_grid.artist_at(event.scenePos())
+        if artist is None:
             return
         self._last_album_scoll = self.ui.libraryView.verticalScrollBar().value()
-        self.show_album(item.data(QtCore.Qt.UserRole))
+        if self.scan_running():
+            # albums of the opened artist are fetched next
+            self._thread.scheduler.open_artist(artist)
+        self.show_album(artist)
 
     def show_album(self, artist):
-        albums = list(self.system.speakers[0].reference.music_library.get_albums_for_artist(artist))
+        self._shown_artist = artist
+        album_scene = self.album_scenes.get(artist)
+        if album_scene is None:
+            album_scene = self.build_album_scene(artist, mdb.get_artist_albums(artist, self.ICON_TIER))
+            self.album_scenes.put(album_scene)
+        # the shown scene has to stay alive when it is dropped from the cache
+        self._album_scene = album_scene
+        self.ui.libraryView.setScene(album_scene.scene)
+        self.ui.libraryView.centerOn(album_scene.title)
+
+    def prefetch_album(self):
+        # prepare the album scene of the artist below the pointer
+        if self._hovered_artist is not None and self._hovered_artist not in self.album_scenes:
+            self.album_loader.request(self._hovered_artist, self.ICON_TIER)
+
+    @QtCore.pyqtSlot(str, int, list)
+    def albums_loaded(self, artist, tier, album_data):
+        if tier != self.ICON_TIER or artist in self.album_scenes:
+            return
+        self.album_scenes.put(self.build_album_scene(artist, album_data))
 
+    def build_album_scene(self, artist, album_data):
         ipr = self.ALBUMS_PER_ROW
         block_width = self.ui.libraryView.FULL_LIBRARY_WIDTH // ipr
         img_scale = int(block_width * 3 / 5)
@@ -283,18 +446,13 @@ class GUIWindow(QtWidgets.QMainWindow):
             0,
             0,
             self.ui.libraryView.FULL_LIBRARY_WIDTH,
-            block_width * ((len(albums) - 1) // ipr + 1) + block_width * 0.5,
+            block_width * ((len(album_data) - 1) // ipr + 1) + block_width * 0.5,
         )
 
         title = QtWidgets.QGraphicsTextItem(f"Albums by {artist}:")
         title.setPos(10, 5)
         scene.addItem(title)
-
-        album_data = []
-        for album in albums:
-            img_data, date = mdb.get_image(artist, album.title)
-            album_data.append((date, album.title, img_data, album.get_uri()))
-        album_data.sort()
+        album_scene = AlbumScene(artist, scene, title, img_scale)
 
         for i, (date, album, img_data, uri) in enumerate(album_data):
             label = QtWidgets.QGraphicsTextItem()
@@ -309,33 +467,37 @@ class GUIWindow(QtWidgets.QMainWindow):
             if not img_data:
                 continue
 
-            pixmap = QtGui.QPixmap()
-            pixmap.loadFromData(img_data)
-            pixmap = pixmap.scaled(img_scale, img_scale, aspectRatioMode=QtCore.Qt.KeepAspectRatio)
-
             item = QtWidgets.QGraphicsPixmapItem()
-            item.setPixmap(pixmap)
             item.setPos(
                 block_width * (i % ipr) + img_offset, block_width * (i // ipr) + self.MARGIN + block_width * 0.25
             )
             item.setData(QtCore.Qt.UserRole, (artist, album, uri))
 
             scene.addItem(item)
+            album_scene.icons[album] = item
+            pixmap = self.request_pixmap((artist, album, img_scale), lambda: img_data)
+            if pixmap is not None:
+                item.setPixmap(pixmap)
 
         scene.mouseReleaseEvent = self.select_album
-        self.ui.libraryView.setScene(scene)
-        self.ui.libraryView.centerOn(title)
+        return album_scene
 
     def select_album(self, event: QtWidgets.QGraphicsSceneMouseEvent):
         scene: QtWidgets.QGraphicsScene = self.ui.libraryView.scene()
         trans = self.ui.libraryView.transform()
         item = scene.itemAt(event.scenePos(), trans)
         if item is None:
-            self.ui.libraryView.setScene(self.album_scene)
+            self._shown_artist = None
+            self.ui.libraryView.setScene(self.artist_grid.scene)
             self.ui.libraryView.verticalScrollBar().setValue(self._last_album_scoll)
+            self.artist_grid.update_tiles()
+            if self.scan_running():
+                self._thread.scheduler.open_artist(None)
             return
         else:
             artist, album, uri = item.data(QtCore.Qt.UserRole)
+            if uri is None:
+                uri = self.album_uri(artist, album)
             group = self.current_group()
             if event.button() == QtCore.Qt.LeftButton:
                 group.coordinator.add_uri_to_queue(uri)
@@ -348,13 +510,21 @@ class GUIWindow(QtWidgets.QMainWindow):
             self.update_queue()
             self.update_playing_info()
 
+    def album_uri(self, artist, album):
+        uri = mdb.get_album_uri(artist, album)
+        if uri is None:
+            # albums stored by older versions without uri
+            albums = list(self.system.speakers[0].reference.music_library.get_albums_for_artist(artist))
+            for ai in albums:
+                if ai.title == album:
+                    uri = ai.get_uri()
+            if uri is not None:
+                mdb.set_album_uri(artist, album, uri)
+        return uri
+
     def append_album(self, artist, album):
         group = self.current_group()
-        albums = list(self.system.speakers[0].reference.music_library.get_albums_for_artist(artist))
-        uri = None
-        for ai in albums:
-            if ai.title == album:
-                uri = ai.get_uri()
+        uri = self.album_uri(artist, album)
         if uri is None:
             log.debug(f"Didn't fid right album uri for {album}")
             return
@@ -366,29 +536,12 @@ class GUIWindow(QtWidgets.QMainWindow):
             self.update_playing_info()
 
     def hover_album(self, event: QtWidgets.QGraphicsSceneMouseEvent):
-        scene: QtWidgets.QGraphicsScene = self.ui.libraryView.scene()
-        trans = self.ui.libraryView.transform()
-        item = scene.itemAt(event.scenePos(), trans)
-        if item is None:
-            if self._changed_label:
-                self._changed_label[0].setFont(self._changed_label[1])
-                self._changed_label = None
-            return
-        label = self._artist_labels.get(item.data(QtCore.Qt.UserRole), None)
-        if label is None:
-            return
-        elif self._changed_label:
-            if label is self._changed_label[0]:
-                return
-            else:
-                self._changed_label[0].setFont(self._changed_label[1])
-                self._changed_label = None
-        font: QtGui.QFont = label.font()
-        bfont = QtGui.QFont(font)
-        bfont.setPointSizeF(bfont.pointSizeF() * 1.5)
-        bfont.setBold(True)
-        label.setFont(bfont)
-        self._changed_label = (label, font)
+        # the tiles highlight themselves through the hover events dispatched by the scene
+        QtWidgets.QGraphicsScene.mouseMoveEvent(self.artist_grid.scene, event)
+        artist = self.artist_grid.artist_at(event.scenePos())
+        if artist != self._hovered_artist:
+            self._hovered_artist = artist
+            self._hover_timer.start(self.HOVER_DELAY)
 
     def update_queue(self):
         self._last_selected_track = None
@@ -411,7 +564,14 @@ class GUIWindow(QtWidgets.QMainWindow):
             title = item_data.get("title", "")
             if album != current_album:
                 current_album = album
-                self.ui.groupQueueList.addItem(f"{artist} | {album}")
+                album_item = QtWidgets.QListWidgetItem(f"{artist} | {album}")
+                album_item.setData(QtCore.Qt.UserRole, (artist, album))
+                self.ui.groupQueueList.addItem(album_item)
+                pixmap = self.request_pixmap(
+                    (artist, album, self.QUEUE_ICON_SIZE), lambda: mdb.get_thumbnail(artist, album, 0)[0]
+                )
+                if pixmap is not None:
+                    album_item.setIcon(QtGui.QIcon(pixmap))
             self.ui.groupQueueList.addItem(f"\t{title}")
         cur_vol = group.reference.volume
         self.volume_control.setValue(int(cur_vol))
@@ -458,38 +618,52 @@ class GUIWindow(QtWidgets.QMainWindow):
         self.ui.NowPlayingAlbum.setText(track.album)
         self.ui.NowPlayingArtist.setText(track.artist)
         self.ui.NowPlayingTime.setText(f"{track.position}/{track.duration}")
+        if track.album_art == self._playing_art:
+            return
+        self._playing_art = track.album_art
         if track.album_art == "":
+            self._playing_key = None
             self.ui.NowPlayingArt.clear()
             return
 
-        if track.album_art not in self.image_cache:
-            try:
-                data = urllib.request.urlopen(track.album_art).read()
-            except Exception:
-                log.warning(f"Could not get album art for {track.album_art}", exc_info=True)
-                data = None
-            self.image_cache[track.album_art] = data
-        img_data = self.image_cache[track.album_art]
-        pixmap = QtGui.QPixmap()
-        pixmap.loadFromData(img_data)
-        self.ui.NowPlayingArt.setPixmap(pixmap)
+        # unscaled artwork, streams without album are cached by url
+        if track.artist and track.album:
+            self._playing_key = (track.artist, track.album, None)
+        else:
+            self._playing_key = (None, track.album_art, None)
+        # the artwork is downloaded in the decoder pool, waiting for the speaker would block the GUI
+        pixmap = self.request_pixmap(self._playing_key, lambda: partial(self.fetch_artwork, track.album_art))
+        if pixmap is not None:
+            # otherwise the label is set once the image is decoded
+            self.ui.NowPlayingArt.setPixmap(pixmap)
+
+    def fetch_artwork(self, url):
+        try:
+            return http_pool.fetch(url)
+        except Exception:
+            log.warning(f"Could not get album art for {url}", exc_info=True)
+            return None
 
     def _set_icon_size(self, index):
         if index == 0:
             self.ITEMS_PER_ROW = 10
             self.ALBUMS_PER_ROW = 6
+            self.ICON_TIER = 0
         elif index == 1:
             self.ITEMS_PER_ROW = 5
             self.ALBUMS_PER_ROW = 3
+            self.ICON_TIER = 1
         elif index == 2:
             self.ITEMS_PER_ROW = 3
             self.ALBUMS_PER_ROW = 2
+            self.ICON_TIER = 2
         total_margins = (self.ITEMS_PER_ROW - 1) * self.MARGIN
         self.ITEM_SCALE = (self.ui.libraryView.FULL_LIBRARY_WIDTH - total_margins) // self.ITEMS_PER_ROW
 
     @QtCore.pyqtSlot(int)
     def change_icon_size(self, index):
         self._set_icon_size(index)
+        self.album_scenes.clear()
         self.build_library()
 
     @QtCore.pyqtSlot()
@@ -569,6 +743,10 @@ class GUIWindow(QtWidgets.QMainWindow):
             self.restoreState(self.settings.value("mainWindow/state"))
 
     def closeEvent(self, event: QtGui.QCloseEvent):
+        self.artist_filter.wait()
+        self.album_loader.wait()
+        self.image_decoder.clear()
+        self.image_decoder.wait()
         self._soco_events.quit()
         if getattr(self, "_thread", None):
             self._thread.quit()
@@ -4,64 +4,358 @@ Build a copy of Artist/Album of the Sonos music library.
 Download album art and store locally for quick access.
 """
 
+import hashlib
 import logging as log
 import os
 import sqlite3
+import threading
+import time
+
+from contextlib import nullcontext
+from pathlib import Path
+
+DB_PATH = "music_library.db"
+
+# Each entry upgrades the database by one schema version, the index in the list + 1
+# is the version number stored in the schema_version table after it was applied.
+MIGRATIONS = [
+    # 1: initial album table as created by all versions before the migration support
+    """CREATE TABLE IF NOT EXISTS album_art (
+                id INTEGER PRIMARY KEY,
+                artist TEXT NOT NULL,
+                album TEXT NOT NULL,
+                album_art BLOB,
+                date INTEGER,
+                genre TEXT);""",
+    # 2: indices for album lookup, genre filters and latest album per artist,
+    #    duplicate albums from older versions are removed keeping the newest entry
+    """DELETE FROM album_art WHERE id NOT IN (SELECT MAX(id) FROM album_art GROUP BY artist, album);
+    CREATE UNIQUE INDEX idx_album_art_artist_album ON album_art (artist, album);
+    CREATE INDEX idx_album_art_genre ON album_art (genre);
+    CREATE INDEX idx_album_art_artist_date ON album_art (artist, date);""",
+    # 3: pre-scaled artwork for each icon size tier of the browse views
+    """CREATE TABLE album_thumbnail (
+                album_id INTEGER NOT NULL REFERENCES album_art(id) ON DELETE CASCADE,
+                tier INTEGER NOT NULL,
+                image BLOB NOT NULL,
+                PRIMARY KEY (album_id, tier));""",
+    # 4: artwork and thumbnails are stored once per content hash and referenced by the albums
+    """CREATE TABLE artwork (
+                hash TEXT PRIMARY KEY,
+                image BLOB NOT NULL);
+    CREATE TABLE artwork_thumbnail (
+                hash TEXT NOT NULL REFERENCES artwork(hash) ON DELETE CASCADE,
+                tier INTEGER NOT NULL,
+                image BLOB NOT NULL,
+                PRIMARY KEY (hash, tier));
+    ALTER TABLE album_art ADD COLUMN artwork_hash TEXT REFERENCES artwork(hash);
+    UPDATE album_art SET artwork_hash = content_hash(album_art) WHERE album_art IS NOT NULL;
+    INSERT OR IGNORE INTO artwork (hash, image)
+        SELECT artwork_hash, album_art FROM album_art WHERE artwork_hash IS NOT NULL;
+    INSERT OR IGNORE INTO artwork_thumbnail (hash, tier, image)
+        SELECT a.artwork_hash, t.tier, t.image FROM album_thumbnail t
+        JOIN album_art a ON a.id = t.album_id WHERE a.artwork_hash IS NOT NULL;
+    DROP TABLE album_thumbnail;
+    ALTER TABLE album_art DROP COLUMN album_art;
+    CREATE INDEX idx_album_art_artwork_hash ON album_art (artwork_hash);""",
+    # 5: full text index of artist, album and genre names kept in sync with album_art by triggers
+    """CREATE VIRTUAL TABLE album_search USING fts5(
+                artist, album, genre,
+                content='album_art', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+    INSERT INTO album_search (album_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)');
+    INSERT INTO album_search (album_search) VALUES ('rebuild');
+    CREATE TRIGGER album_search_insert AFTER INSERT ON album_art BEGIN
+        INSERT INTO album_search (rowid, artist, album, genre) VALUES (new.id, new.artist, new.album, new.genre);
+    END;
+    CREATE TRIGGER album_search_delete AFTER DELETE ON album_art BEGIN
+        INSERT INTO album_search (album_search, rowid, artist, album, genre)
+            VALUES ('delete', old.id, old.artist, old.album, old.genre);
+    END;
+    CREATE TRIGGER album_search_update AFTER UPDATE OF artist, album, genre ON album_art BEGIN
+        INSERT INTO album_search (album_search, rowid, artist, album, genre)
+            VALUES ('delete', old.id, old.artist, old.album, old.genre);
+        INSERT INTO album_search (rowid, artist, album, genre) VALUES (new.id, new.artist, new.album, new.genre);
+    END;""",
+    # 6: artwork uri of the Sonos album item to detect changed albums and state of the last library sync
+    """ALTER TABLE album_art ADD COLUMN art_uri TEXT;
+    CREATE TABLE sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT);""",
+    # 7: full list of album artists of the Sonos library
+    """CREATE TABLE artist (
+                name TEXT PRIMARY KEY) WITHOUT ROWID;""",
+    # 8: album uri for queueing and the tracks of each album
+    """ALTER TABLE album_art ADD COLUMN uri TEXT;
+    CREATE TABLE track (
+                id INTEGER PRIMARY KEY,
+                album_id INTEGER NOT NULL REFERENCES album_art(id) ON DELETE CASCADE,
+                track_number INTEGER,
+                title TEXT,
+                duration TEXT,
+                uri TEXT NOT NULL);
+    CREATE INDEX idx_track_album ON track (album_id, track_number);""",
+    # 9: source the artwork was read from, embedded in the track, image in the album folder or the speaker
+    """ALTER TABLE album_art ADD COLUMN art_source TEXT;""",
+    # 10: albums of an unfinished library scan to resume it on next start
+    """CREATE TABLE scan_queue (
+                artist TEXT NOT NULL,
+                album TEXT NOT NULL,
+                art_uri TEXT,
+                UNIQUE (artist, album));""",
+    # 11: failed scan stages of albums to retry them with backoff
+    """CREATE TABLE scan_failure (
+                album_id INTEGER NOT NULL REFERENCES album_art(id) ON DELETE CASCADE,
+                stage TEXT NOT NULL,
+                error TEXT,
+                attempts INTEGER NOT NULL,
+                next_retry REAL NOT NULL,
+                PRIMARY KEY (album_id, stage)) WITHOUT ROWID;
+    CREATE INDEX idx_scan_failure_next_retry ON scan_failure (next_retry);""",
+]
+
+# schema version which moves the artwork of the albums into the artwork table
+ARTWORK_MIGRATION = 4
+
+INSERT_ARTWORK_QUERY = """INSERT OR IGNORE INTO artwork (hash, image) VALUES (?,?);"""
+
+PRUNE_ARTWORK_QUERY = """DELETE FROM artwork WHERE hash NOT IN
+(SELECT artwork_hash FROM album_art WHERE artwork_hash IS NOT NULL);"""
 
 INSERT_QUERY = """INSERT INTO album_art
-(artist, album, album_art, date, genre) VALUES (?,?,?,?,?);"""
+(artist, album, artwork_hash, date, genre, art_uri, uri, art_source) VALUES (?,?,?,?,?,?,?,?)
+ON CONFLICT (artist, album) DO UPDATE SET
+artwork_hash=excluded.artwork_hash, date=excluded.date, genre=excluded.genre,
+art_uri=excluded.art_uri, uri=COALESCE(excluded.uri, uri), art_source=excluded.art_source;"""
+
+ALBUM_URI_QUERY = """SELECT uri FROM album_art WHERE artist = ? AND album = ?;"""
+SET_ALBUM_URI_QUERY = """UPDATE album_art SET uri = ? WHERE artist = ? AND album = ?;"""
+
+DELETE_TRACKS_QUERY = """DELETE FROM track
+WHERE album_id = (SELECT id FROM album_art WHERE artist = ? AND album = ?);"""
+INSERT_TRACK_QUERY = """INSERT INTO track (album_id, track_number, title, duration, uri)
+SELECT id, ?, ?, ?, ? FROM album_art WHERE artist = ? AND album = ?;"""
+TRACKS_QUERY = """SELECT t.track_number, t.title, t.duration, t.uri FROM track t
+JOIN album_art a ON a.id = t.album_id WHERE a.artist = ? AND a.album = ? ORDER BY t.track_number;"""
+
+# all albums of an artist with the thumbnail of the given tier for the album view
+ARTIST_ALBUMS_QUERY = """SELECT a.date, a.album, COALESCE(t.image, w.image), a.uri FROM album_art a
+LEFT JOIN artwork w ON w.hash = a.artwork_hash
+LEFT JOIN artwork_thumbnail t ON t.hash = a.artwork_hash AND t.tier = ?
+WHERE a.artist = ? ORDER BY a.date, a.album;"""
+
+DELETE_QUERY = """DELETE FROM album_art WHERE artist = ? AND album = ?;"""
+
+UPDATE_ART_URI_QUERY = """UPDATE album_art SET art_uri = ? WHERE artist = ? AND album = ?;"""
+UPDATE_TAGS_QUERY = """UPDATE album_art SET date = ?, genre = ? WHERE artist = ? AND album = ?;"""
+UPDATE_ARTWORK_QUERY = """UPDATE album_art SET artwork_hash = ?, art_source = ? WHERE artist = ? AND album = ?;"""
+
+# the delay doubles with each failed attempt
+RECORD_FAILURE_QUERY = """INSERT INTO scan_failure (album_id, stage, error, attempts, next_retry)
+SELECT id, :stage, :error, 1, :now + :delay FROM album_art WHERE artist = :artist AND album = :album
+ON CONFLICT (album_id, stage) DO UPDATE SET
+error=excluded.error, attempts=attempts+1, next_retry=:now + :delay * (1 << attempts);"""
+CLEAR_FAILURE_QUERY = """DELETE FROM scan_failure
+WHERE stage = ? AND album_id = (SELECT id FROM album_art WHERE artist = ? AND album = ?);"""
+DUE_FAILURES_QUERY = """SELECT a.artist, a.album, a.art_uri, GROUP_CONCAT(f.stage) FROM scan_failure f
+JOIN album_art a ON a.id = f.album_id
+WHERE f.next_retry <= ? AND f.attempts < ? GROUP BY f.album_id ORDER BY MIN(f.next_retry);"""
+
+FINGERPRINT_QUERY = """SELECT artist,album,art_uri FROM album_art;"""
+
+ARTIST_NAMES_QUERY = """SELECT name FROM artist;"""
+DELETE_ARTISTS_QUERY = """DELETE FROM artist;"""
+INSERT_ARTIST_QUERY = """INSERT OR IGNORE INTO artist (name) VALUES (?);"""
+
+SCAN_QUEUE_QUERY = """SELECT artist, album, art_uri FROM scan_queue ORDER BY rowid;"""
+CLEAR_SCAN_QUEUE_QUERY = """DELETE FROM scan_queue;"""
+INSERT_SCAN_QUEUE_QUERY = """INSERT OR IGNORE INTO scan_queue (artist, album, art_uri) VALUES (?,?,?);"""
+DELETE_SCAN_QUEUE_QUERY = """DELETE FROM scan_queue WHERE artist = ? AND album = ?;"""
+
+SYNC_STATE_QUERY = """SELECT value FROM sync_state WHERE key = ?;"""
+SET_SYNC_STATE_QUERY = """INSERT OR REPLACE INTO sync_state (key, value) VALUES (?,?);"""
+
+SEARCH_QUERY = """SELECT w.image,a.date FROM album_art a
+LEFT JOIN artwork w ON w.hash = a.artwork_hash
+WHERE a.artist = ? AND a.album = ?;"""
+
+SEARCH_QUERY_2 = """SELECT w.image,a.date FROM album_art a
+LEFT JOIN artwork w ON w.hash = a.artwork_hash
+WHERE a.artist = ? ORDER BY a.date DESC LIMIT 1;"""
+
+INSERT_THUMBNAIL_QUERY = """INSERT OR REPLACE INTO artwork_thumbnail (hash, tier, image)
+SELECT artwork_hash, ?, ? FROM album_art WHERE artist = ? AND album = ? AND artwork_hash IS NOT NULL;"""
+
+INSERT_ARTWORK_THUMBNAIL_QUERY = """INSERT OR REPLACE INTO artwork_thumbnail (hash, tier, image) VALUES (?,?,?);"""
+
+MISSING_THUMBNAILS_QUERY = """SELECT w.hash FROM artwork w
+LEFT JOIN artwork_thumbnail t ON t.hash = w.hash GROUP BY w.hash HAVING COUNT(t.tier) < ?;"""
+
+ARTWORK_QUERY = """SELECT image FROM artwork WHERE hash = ?;"""
 
-SEARCH_QUERY = """SELECT album_art,date FROM album_art
-WHERE artist = ? AND album = ?;"""
+# artwork of the newest album of an artist
+LAST_ARTWORK_QUERY = """SELECT artwork_hash FROM album_art WHERE artist = ? ORDER BY date DESC LIMIT 1;"""
 
-SEARCH_QUERY_2 = """SELECT album_art,date FROM album_art
-WHERE artist = ? ORDER BY date DESC;"""
+# falls back to the full size artwork if no thumbnail was stored for the tier
+ARTWORK_THUMBNAIL_QUERY = """SELECT COALESCE(t.image, w.image) FROM artwork w
+LEFT JOIN artwork_thumbnail t ON t.hash = w.hash AND t.tier = ? WHERE w.hash = ?;"""
+
+# falls back to the full size artwork if no thumbnail was stored for the tier
+THUMBNAIL_QUERY = """SELECT COALESCE(t.image, w.image), a.date FROM album_art a
+LEFT JOIN artwork w ON w.hash = a.artwork_hash
+LEFT JOIN artwork_thumbnail t ON t.hash = a.artwork_hash AND t.tier = ?
+WHERE a.artist = ? AND a.album = ?;"""
 
 GENRE_QUREY = """SELECT DISTINCT genre FROM album_art;"""
 GENRE_COUNT_QUREY = """SELECT COUNT(album) FROM album_art WHERE genre = ?;"""
 ALBUM_COUNT_QUREY= """SELECT COUNT(album) FROM album_art;"""
 
+ALBUM_IDS_QUERY = """SELECT id FROM album_art;"""
+GENRE_ALBUM_IDS_QUERY = """SELECT id FROM album_art WHERE genre = ?;"""
+ALBUM_BY_ID_QUERY = """SELECT artist,album FROM album_art WHERE id = ?;"""
+
 GENRE_ALBUMS_QUREY = """SELECT artist,album FROM album_art WHERE genre = ?;"""
 ALBUM_ALL_QUREY= """SELECT artist,album FROM album_art;"""
 
 ARTIST_QUREY = """SELECT DISTINCT artist FROM album_art ORDER BY artist ASC;"""
 ARTIST_GENRE_QUREY = """SELECT DISTINCT artist, genre FROM album_art WHERE genre = ? ORDER BY artist ASC;"""
 
+# artists ordered by the best match of any of their albums, artist names are weighted highest
+ARTIST_SEARCH_QUERY = """SELECT a.artist FROM album_search s JOIN album_art a ON a.id = s.rowid
+WHERE album_search MATCH ? GROUP BY a.artist ORDER BY MIN(s.rank) LIMIT ?;"""
+
+
+class ConnectionManager:
+    """
+    Hands out one sqlite connection per thread, opened on first use.
+
+    Each thread can have a writer and a read-only connection. GUI queries use the
+    read-only connection, which never takes the write lock and, with the write ahead
+    log, is not blocked by the library scan writing to the database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._prepared = False
+
+    def prepare(self):
+        # create and upgrade the database once before any connection is handed out
+        with self._lock:
+            if self._prepared:
+                return
+            if not os.path.exists(self.path):
+                log.info("creating database")
+            connection = sqlite3.connect(self.path)
+            connection.create_function("content_hash", 1, content_hash, deterministic=True)
+            # write ahead log allows reading the database while the library scan is writing to it
+            connection.execute("PRAGMA journal_mode = WAL;")
+            try:
+                migrate_db(connection)
+            finally:
+                connection.close()
+            self._prepared = True
+
+    def _configure(self, connection):
+        connection.execute("PRAGMA foreign_keys = ON;")
+        connection.execute("PRAGMA busy_timeout = 5000;")
+
+    def writer(self):
+        connection = getattr(self._local, "writer", None)
+        if connection is None:
+            self.prepare()
+            connection = sqlite3.connect(self.path)
+            self._configure(connection)
+            self._local.writer = connection
+        return connection
+
+    def reader(self):
+        connection = getattr(self._local, "reader", None)
+        if connection is None:
+            self.prepare()
+            connection = sqlite3.connect(f"{Path(self.path).absolute().as_uri()}?mode=ro", uri=True)
+            self._configure(connection)
+            connection.execute("PRAGMA query_only = ON;")
+            self._local.reader = connection
+        return connection
+
+    def close(self):
+        # close the connections of the calling thread
+        for name in ("writer", "reader"):
+            connection = getattr(self._local, name, None)
+            if connection is not None:
+                connection.close()
+                setattr(self._local, name, None)
+
+
+connections = ConnectionManager(DB_PATH)
+
+
+def content_hash(data):
+    """
+    Key of an artwork in the database, identical images are only stored once.
+    """
+    if data is None:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
 
 def connect_db():
-    global db
-    build_table = not os.path.exists("music_library.db")
-    db = sqlite3.connect("music_library.db")
-
-    if build_table:
-        log.info("creating database")
-        cursor = db.cursor()
-        cursor.execute(
-            """CREATE TABLE album_art (
-                            id INTEGER PRIMARY KEY,
-                            artist TEXT NOT NULL,
-                            album TEXT NOT NULL,
-                            album_art BLOB,
-                            date INTEGER,
-                            genre TEXT);"""
-        )
-        cursor.close()
-        db.commit()
+    connections.prepare()
+
+
+def get_schema_version(connection):
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL);")
+    cursor.execute("SELECT MAX(version) FROM schema_version;")
+    version = cursor.fetchone()[0]
+    cursor.close()
+    connection.commit()
+    return version or 0
+
 
+def migrate_db(connection):
+    """
+    Upgrade the database schema in place by applying all migrations
+    newer than the version stored in the database.
+    """
+    version = get_schema_version(connection)
+    if version > len(MIGRATIONS):
+        log.warning(f"database schema version {version} is newer than supported version {len(MIGRATIONS)}")
+        return
+    elif version == len(MIGRATIONS):
+        return
+    compact = False
+    for new_version, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        if new_version == ARTWORK_MIGRATION:
+            # artwork moved out of existing albums leaves the space of the duplicate blobs unused
+            compact = connection.execute("SELECT EXISTS (SELECT 1 FROM album_art);").fetchone()[0] == 1
+        log.info(f"migrating database to schema version {new_version}")
+        try:
+            connection.executescript(
+                f"BEGIN;\n{script}\nINSERT INTO schema_version (version) VALUES ({new_version});\nCOMMIT;"
+            )
+        except sqlite3.Error:
+            if connection.in_transaction:
+                connection.rollback()
+            log.error(f"database migration to schema version {new_version} failed", exc_info=True)
+            raise
+    if compact:
+        # give space of removed or moved data back to the file system
+        log.info("compacting database after migration")
+        connection.execute("VACUUM;")
 
-def insert_image(artist, album, image, date, genre=None):
-    cursor = db.cursor()
+
+def _date_value(date):
     try:
-        date = int(date)
+        return int(date)
     except ValueError:
-        date = -1
-    cursor.execute(INSERT_QUERY, (artist, album, image, date, genre))
-    db.commit()
-    cursor.close()
+        return -1
 
 
 def get_image(artist, album):
-    cursor = db.cursor()
+    cursor = connections.reader().cursor()
     cursor.execute(SEARCH_QUERY, (artist, album))
     rows = cursor.fetchall()
     cursor.close()
@@ -72,8 +366,292 @@ def get_image(artist, album):
         return None, 0
 
 
+class BatchWriter:
+    """
+    Queue inserts and write them to the database in a single transaction
+    once batch_size albums are queued or max_delay seconds passed since the first one.
+    """
+
+    def __init__(self, batch_size=50, max_delay=2.0, metrics=None):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # optional ScanMetrics, each written batch is recorded as db stage
+        self.metrics = metrics
+        # number of written batches
+        self.batches = 0
+        self._queries = []
+        self._items = 0
+        self._first_queued = 0.0
+        self._current_item = None
+
+    def insert_image(self, artist, album, image, date, genre=None, art_uri=None, uri=None, art_source=None):
+        self._start_item((artist, album))
+        artwork_hash = content_hash(image)
+        if artwork_hash is not None:
+            self._queries.append((INSERT_ARTWORK_QUERY, (artwork_hash, image)))
+        self._queries.append(
+            (INSERT_QUERY, (artist, album, artwork_hash, _date_value(date), genre, art_uri, uri, art_source))
+        )
+
+    def insert_tracks(self, artist, album, tracks):
+        # tracks as (track_number, title, duration, uri), replacing the tracks stored before
+        self._start_item((artist, album))
+        self._queries.append((DELETE_TRACKS_QUERY, (artist, album)))
+        for track in tracks:
+            self._queries.append((INSERT_TRACK_QUERY, (*track, artist, album)))
+
+    def insert_thumbnails(self, artist, album, thumbnails):
+        self._start_item((artist, album))
+        for tier, image in thumbnails.items():
+            self._queries.append((INSERT_THUMBNAIL_QUERY, (tier, image, artist, album)))
+
+    def insert_artwork_thumbnails(self, artwork_hash, thumbnails):
+        self._start_item(artwork_hash)
+        for tier, image in thumbnails.items():
+            self._queries.append((INSERT_ARTWORK_THUMBNAIL_QUERY, (artwork_hash, tier, image)))
+
+    def delete_album(self, artist, album):
+        self._start_item((artist, album))
+        self._queries.append((DELETE_QUERY, (artist, album)))
+
+    def update_art_uri(self, artist, album, art_uri):
+        self._start_item((artist, album))
+        self._queries.append((UPDATE_ART_URI_QUERY, (art_uri, artist, album)))
+
+    def update_tags(self, artist, album, date, genre):
+        self._start_item((artist, album))
+        self._queries.append((UPDATE_TAGS_QUERY, (_date_value(date), genre, artist, album)))
+
+    def update_artwork(self, artist, album, image, art_source):
+        self._start_item((artist, album))
+        artwork_hash = content_hash(image)
+        if artwork_hash is not None:
+            self._queries.append((INSERT_ARTWORK_QUERY, (artwork_hash, image)))
+        self._queries.append((UPDATE_ARTWORK_QUERY, (artwork_hash, art_source, artist, album)))
+
+    def record_failure(self, artist, album, stage, error, retry_delay):
+        # retry_delay in seconds after the first failure, doubled for each further attempt
+        self._start_item((artist, album))
+        parameters = dict(stage=stage, error=error, now=time.time(), delay=retry_delay, artist=artist, album=album)
+        self._queries.append((RECORD_FAILURE_QUERY, parameters))
+
+    def clear_failure(self, artist, album, stage):
+        self._start_item((artist, album))
+        self._queries.append((CLEAR_FAILURE_QUERY, (stage, artist, album)))
+
+    def remove_scan_item(self, artist, album):
+        # written in the same transaction as the album, so a resumed scan continues after it
+        self._start_item((artist, album))
+        self._queries.append((DELETE_SCAN_QUEUE_QUERY, (artist, album)))
+
+    def _start_item(self, key):
+        # batches are only closed between albums to keep each album in a single transaction
+        if key == self._current_item:
+            return
+        if self._items >= self.batch_size or (
+            self._queries and (time.monotonic() - self._first_queued) >= self.max_delay
+        ):
+            self.flush()
+        if not self._queries:
+            self._first_queued = time.monotonic()
+        self._items += 1
+        self._current_item = key
+
+    def flush(self):
+        if not self._queries:
+            return
+        log.debug(f"writing batch of {self._items} albums to database")
+        db = connections.writer()
+        with self.metrics.measure("db") if self.metrics is not None else nullcontext():
+            with db:
+                for query, parameters in self._queries:
+                    db.execute(query, parameters)
+        self._queries = []
+        self._items = 0
+        self._current_item = None
+        self.batches += 1
+
+
+def prune_artwork():
+    # remove artwork no longer referenced by any album, thumbnails are removed by cascade
+    db = connections.writer()
+    with db:
+        cursor = db.execute(PRUNE_ARTWORK_QUERY)
+    if cursor.rowcount > 0:
+        log.info(f"removed {cursor.rowcount} unused artwork images from database")
+
+
+def get_album_uri(artist, album):
+    cursor = connections.reader().cursor()
+    cursor.execute(ALBUM_URI_QUERY, (artist, album))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return rows[0][0]
+    else:
+        return None
+
+
+def set_album_uri(artist, album, uri):
+    db = connections.writer()
+    with db:
+        db.execute(SET_ALBUM_URI_QUERY, (uri, artist, album))
+
+
+def get_tracks(artist, album):
+    cursor = connections.reader().cursor()
+    cursor.execute(TRACKS_QUERY, (artist, album))
+    rows = cursor.fetchall()
+    cursor.close()
+    return list(rows)
+
+
+def get_artist_albums(artist, tier):
+    # (date, album, thumbnail, uri) of all albums of the artist sorted by date
+    cursor = connections.reader().cursor()
+    cursor.execute(ARTIST_ALBUMS_QUERY, (tier, artist))
+    rows = cursor.fetchall()
+    cursor.close()
+    return list(rows)
+
+
+def get_sync_state(key):
+    cursor = connections.reader().cursor()
+    cursor.execute(SYNC_STATE_QUERY, (key,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return rows[0][0]
+    else:
+        return None
+
+
+def set_sync_state(key, value):
+    db = connections.writer()
+    with db:
+        db.execute(SET_SYNC_STATE_QUERY, (key, value))
+
+
+def get_artist_names():
+    cursor = connections.reader().cursor()
+    cursor.execute(ARTIST_NAMES_QUERY)
+    rows = cursor.fetchall()
+    cursor.close()
+    return [line[0] for line in rows]
+
+
+def set_artists(names):
+    # replace the stored artist list in a single transaction
+    db = connections.writer()
+    with db:
+        db.execute(DELETE_ARTISTS_QUERY)
+        db.executemany(INSERT_ARTIST_QUERY, [(name,) for name in names])
+
+
+def get_scan_queue():
+    # (artist, album, art_uri) of the albums left by an interrupted scan
+    cursor = connections.reader().cursor()
+    cursor.execute(SCAN_QUEUE_QUERY)
+    rows = cursor.fetchall()
+    cursor.close()
+    return [tuple(row) for row in rows]
+
+
+def set_scan_queue(update_id, albums):
+    # checkpoint of a new scan, albums as (artist, album, art_uri)
+    db = connections.writer()
+    with db:
+        db.execute(CLEAR_SCAN_QUEUE_QUERY)
+        db.executemany(INSERT_SCAN_QUEUE_QUERY, albums)
+        db.execute(SET_SYNC_STATE_QUERY, ("scan_update_id", update_id))
+
+
+def clear_scan_queue():
+    db = connections.writer()
+    with db:
+        db.execute(CLEAR_SCAN_QUEUE_QUERY)
+
+
+def get_due_failures(max_attempts):
+    # (artist, album, art_uri, failed stages) of albums with a retry due
+    cursor = connections.reader().cursor()
+    cursor.execute(DUE_FAILURES_QUERY, (time.time(), max_attempts))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [(artist, album, art_uri, set(stages.split(","))) for artist, album, art_uri, stages in rows]
+
+
+def get_album_fingerprints():
+    # artwork uri of each album in the database, used to compare with the Sonos library
+    cursor = connections.reader().cursor()
+    cursor.execute(FINGERPRINT_QUERY)
+    rows = cursor.fetchall()
+    cursor.close()
+    return {(artist, album): art_uri for artist, album, art_uri in rows}
+
+
+def get_missing_thumbnails(tiers):
+    # hashes of artwork with less than the given number of thumbnail tiers
+    cursor = connections.reader().cursor()
+    cursor.execute(MISSING_THUMBNAILS_QUERY, (tiers,))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [line[0] for line in rows]
+
+
+def get_artwork(artwork_hash):
+    cursor = connections.reader().cursor()
+    cursor.execute(ARTWORK_QUERY, (artwork_hash,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return rows[0][0]
+    else:
+        return None
+
+
+def get_last_artwork(artist):
+    # hash of the artwork of the newest album of the artist
+    cursor = connections.reader().cursor()
+    cursor.execute(LAST_ARTWORK_QUERY, (artist,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return rows[0][0]
+    else:
+        return None
+
+
+def get_artwork_thumbnail(artwork_hash, tier):
+    cursor = connections.reader().cursor()
+    cursor.execute(ARTWORK_THUMBNAIL_QUERY, (tier, artwork_hash))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return rows[0][0]
+    else:
+        return None
+
+
+def get_thumbnail(artist, album, tier):
+    cursor = connections.reader().cursor()
+    cursor.execute(THUMBNAIL_QUERY, (tier, artist, album))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return tuple(rows[0])
+    else:
+        return None, 0
+
+
 def get_last_image(artist):
-    cursor = db.cursor()
+    cursor = connections.reader().cursor()
     cursor.execute(SEARCH_QUERY_2, (artist,))
     rows = cursor.fetchall()
     cursor.close()
@@ -85,14 +663,14 @@ def get_last_image(artist):
 
 
 def get_genre_list():
-    cursor = db.cursor()
+    cursor = connections.reader().cursor()
     cursor.execute(GENRE_QUREY)
     rows = cursor.fetchall()
     cursor.close()
     return [line[0] for line in rows if line[0] is not None]
 
 def get_num_albums(genre=None):
-    cursor = db.cursor()
+    cursor = connections.reader().cursor()
     if genre is None:
         cursor.execute(ALBUM_COUNT_QUREY)
     else:
@@ -101,8 +679,33 @@ def get_num_albums(genre=None):
     cursor.close()
     return int(rows[0][0])
 
+
+def get_album_ids(genre=None):
+    # row ids of all albums or the albums of a genre, read from the index only
+    cursor = connections.reader().cursor()
+    if genre is None:
+        cursor.execute(ALBUM_IDS_QUERY)
+    else:
+        cursor.execute(GENRE_ALBUM_IDS_QUERY, (genre,))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [line[0] for line in rows]
+
+
+def get_album_by_id(album_id):
+    cursor = connections.reader().cursor()
+    cursor.execute(ALBUM_BY_ID_QUERY, (album_id,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if len(rows) > 0:
+        return tuple(rows[0])
+    else:
+        return None
+
+
 def get_albums(genre=None):
-    cursor = db.cursor()
+    cursor = connections.reader().cursor()
     if genre is None:
         cursor.execute(ALBUM_ALL_QUREY)
     else:
@@ -113,7 +716,7 @@ def get_albums(genre=None):
 
 
 def get_artists(genre=None):
-    cursor = db.cursor()
+    cursor = connections.reader().cursor()
     if genre is None:
         cursor.execute(ARTIST_QUREY)
     else:
@@ -121,3 +724,23 @@ def get_artists(genre=None):
     rows = cursor.fetchall()
     cursor.close()
     return [line[0] for line in rows if line[0] is not None]
+
+
+def _search_expression(text):
+    # every word of the search text is used as quoted prefix, all words have to match
+    words = text.replace('"', " ").split()
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_artists(text, max_items=-1):
+    """
+    Ranked prefix search for artists by words in artist, album or genre names.
+    """
+    expression = _search_expression(text)
+    if not expression:
+        return []
+    cursor = connections.reader().cursor()
+    cursor.execute(ARTIST_SEARCH_QUERY, (expression, max_items))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [line[0] for line in rows]
@@ -0,0 +1,62 @@
+"""
+Decoded artwork of the GUI shared by the library view, album view, queue and now playing label.
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtGui import QPixmap
+
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+
+class PixmapCache:
+    """
+    Least recently used pixmaps within a memory budget in bytes.
+
+    Keys are (artist, album, size) tuples with album None for the icon of an artist
+    and size the edge of the box the image is fitted into, None for unscaled images.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self._pixmaps = OrderedDict()
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+    def __contains__(self, key):
+        return key in self._pixmaps
+
+    @staticmethod
+    def cost(pixmap: QPixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, key):
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap: QPixmap):
+        self.remove(key)
+        self._pixmaps[key] = pixmap
+        self.used += self.cost(pixmap)
+        # the newest pixmap is kept even if it exceeds the budget on its own
+        while self.used > self.budget and len(self._pixmaps) > 1:
+            _, oldest = self._pixmaps.popitem(last=False)
+            self.used -= self.cost(oldest)
+
+    def remove(self, key):
+        pixmap = self._pixmaps.pop(key, None)
+        if pixmap is not None:
+            self.used -= self.cost(pixmap)
+
+    def remove_artist(self, artist):
+        # all sizes of the icon and album covers of an artist, after the library scan changed them
+        for key in [key for key in self._pixmaps if key[0] == artist]:
+            self.remove(key)
+
+    def clear(self):
+        self._pixmaps.clear()
+        self.used = 0
@@ -7,12 +7,12 @@ the probability of each genre to be chosen.
 meaning the genres are weighted by the number of albums they contain.)
 """
 
-import random
+import logging as log
 
 from PyQt5.QtCore import Qt, pyqtSignal, QSettings
 from PyQt5.QtWidgets import QWidget, QCheckBox, QHBoxLayout, QSlider, QVBoxLayout
 
-from . import music_library as mdb
+from .album_sampler import AlbumSampler
 from . random_pools_interface import Ui_RandomPools
 
 class GenreController(QWidget):
@@ -42,6 +42,9 @@ class RandomPoolWidget(QWidget):
         super().__init__(parent=parent)
         self.ui = Ui_RandomPools()
         self.ui.setupUi(self)
+        self.genres = {}
+        self._sampler = None
+        self.ui.genreCheckbox.toggled.connect(self.invalidate_sampler)
 
     def set_genres(self, genres):
         glayout=QVBoxLayout(self.ui.genreControls)
@@ -52,38 +55,37 @@ class RandomPoolWidget(QWidget):
             g = GenreController(self.ui.genreControls, genre)
             glayout.addWidget(g)
             self.genres[genre] = g
+            g.used.toggled.connect(self.invalidate_sampler)
+            g.probability.valueChanged.connect(self.invalidate_sampler)
+        self.invalidate_sampler()
         self.ui.addRandomButton.pressed.connect(self.get_random_choice)
 
     def get_random_choice(self):
         # get a random album from the database
+        if self._sampler is None:
+            self._sampler = self.build_sampler()
+        choice = self._sampler.choice()
+        if choice is None:
+            log.info("No album to choose from")
+            self._sampler = None
+            return
+        artist, album = choice
+        self.append_random_album.emit(artist, album)
+
+    def build_sampler(self):
         if self.ui.genreCheckbox.isChecked():
-            # choose by gener
-            choice_lists = {}
+            # choose by genre
+            genre_weights = {}
             for genre, ctrl in self.genres.items():
                 if ctrl.used.isChecked():
-                    choice_lists[genre] = mdb.get_albums(genre)
-            total_albums = sum([len(gl) for gl in choice_lists.values()])
-            probabilities = []
-            total_proab = 0.
-            for genre, gl in choice_lists.items():
-                defprob = len(gl)/total_albums
-                defprob*= self.genres[genre].probability.value()/100.
-                probabilities.append((genre, defprob))
-                total_proab+=defprob
-            rnd = random.random()*total_proab
-            for genre, defprob in probabilities:
-                if rnd>defprob:
-                    rnd-=defprob
-                else:
-                    genre_albums = choice_lists[genre]
-                    choice = random.randrange(0, len(genre_albums))
-                    artist, album = genre_albums[choice]
-                    break
+                    genre_weights[genre] = ctrl.probability.value() / 100.0
+            return AlbumSampler(genre_weights)
         else:
-            all_albums = mdb.get_albums()
-            choice = random.randrange(0, len(all_albums))
-            artist, album = all_albums[choice]
-        self.append_random_album.emit(artist, album)
+            return AlbumSampler()
+
+    def invalidate_sampler(self):
+        # the sampler is rebuilt on the next choice after genre settings or library changed
+        self._sampler = None
 
     def save_settings(self, settings:QSettings):
         settings.setValue("randomPools/autoadd", int(self.ui.autoAddAlbums.isChecked()))
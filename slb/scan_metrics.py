@@ -0,0 +1,132 @@
+"""
+Timing and error statistics of the library scan stages.
+"""
+
+import threading
+import time
+
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# upper bounds of the latency histogram buckets in seconds, the last bucket is unbounded
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    histogram: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    errors: Counter = field(default_factory=Counter)
+    # wall clock time of the first start and last end of the stage
+    first_start: float = None
+    last_end: float = None
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    @property
+    def mean(self):
+        return self.total_time / self.count if self.count else 0.0
+
+    @property
+    def items_per_second(self):
+        if not self.count or self.last_end is None or self.last_end <= self.first_start:
+            return 0.0
+        return self.count / (self.last_end - self.first_start)
+
+    def percentile(self, fraction):
+        # upper bound of the bucket containing the percentile, max_time for the last bucket
+        if not self.count:
+            return 0.0
+        limit = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.histogram):
+            seen += bucket_count
+            if seen >= limit:
+                if i < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[i], self.max_time)
+                break
+        return self.max_time
+
+    def copy(self):
+        return StageStats(
+            self.count,
+            self.total_time,
+            self.max_time,
+            list(self.histogram),
+            Counter(self.errors),
+            self.first_start,
+            self.last_end,
+        )
+
+
+class ScanMetrics:
+    """
+    Thread safe collection of per stage latencies, throughput and errors.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _stage(self, stage):
+        if stage not in self.stages:
+            self.stages[stage] = StageStats()
+        return self.stages[stage]
+
+    def record(self, stage, start, end):
+        duration = end - start
+        with self._lock:
+            stats = self._stage(stage)
+            stats.count += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            stats.histogram[bisect_left(LATENCY_BUCKETS, duration)] += 1
+            if stats.first_start is None or start < stats.first_start:
+                stats.first_start = start
+            if stats.last_end is None or end > stats.last_end:
+                stats.last_end = end
+
+    def error(self, stage, error):
+        # error is an exception or a short description
+        name = type(error).__name__ if isinstance(error, BaseException) else str(error)
+        with self._lock:
+            self._stage(stage).errors[name] += 1
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, start, time.monotonic())
+
+    def snapshot(self):
+        """
+        Return a copy of the statistics of all stages.
+        """
+        with self._lock:
+            return {stage: stats.copy() for stage, stats in self.stages.items()}
+
+    def summary(self):
+        lines = [f"Library scan metrics after {time.monotonic() - self.started:.1f}s:"]
+        lines.append(
+            f"{'stage':<10}{'items':>7}{'errors':>8}{'items/s':>9}{'mean ms':>9}"
+            f"{'p50 ms':>8}{'p90 ms':>8}{'max ms':>8}"
+        )
+        for stage, stats in self.snapshot().items():
+            lines.append(
+                f"{stage:<10}{stats.count:>7}{stats.error_count:>8}{stats.items_per_second:>9.1f}"
+                f"{1000 * stats.mean:>9.1f}{1000 * stats.percentile(0.5):>8.0f}"
+                f"{1000 * stats.percentile(0.9):>8.0f}{1000 * stats.max_time:>8.0f}"
+            )
+            if stats.errors:
+                errors = ", ".join(f"{name}: {count}" for name, count in stats.errors.most_common())
+                lines.append(f"{'':<10}errors {errors}")
+        return "\n".join(lines)
@@ -0,0 +1,74 @@
+"""
+Order in which the library scan fetches albums.
+
+Albums of the artist opened by the user come first, then those of the artists
+visible in the library view and finally all others in display order. The GUI
+updates the visible artists while the scan is running.
+"""
+
+import threading
+
+from collections import deque
+
+
+class ScanScheduler:
+    def __init__(self, artists):
+        self._positions = {artist: i for i, artist in enumerate(artists)}
+        self._albums = {}
+        self._order = []
+        self._next = 0
+        self._visible = []
+        self._opened = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, ralbums):
+        with self._lock:
+            for ralbum in ralbums:
+                self._albums.setdefault(ralbum.artist, deque()).append(ralbum)
+            self._count = sum(len(albums) for albums in self._albums.values())
+            # artists not displayed are fetched last
+            last = len(self._positions)
+            self._order = sorted(self._albums, key=lambda artist: (self._positions.get(artist, last), artist))
+            self._next = 0
+
+    def set_visible(self, artists):
+        with self._lock:
+            self._visible = list(artists)
+
+    def open_artist(self, artist):
+        with self._lock:
+            self._opened = artist
+
+    def _take(self, artist):
+        albums = self._albums.get(artist)
+        if not albums:
+            return None
+        ralbum = albums.popleft()
+        if not albums:
+            del self._albums[artist]
+        self._count -= 1
+        return ralbum
+
+    def pop(self):
+        """
+        Return the next album to fetch or None if all albums were handed out.
+        """
+        with self._lock:
+            if self._opened is not None:
+                ralbum = self._take(self._opened)
+                if ralbum is not None:
+                    return ralbum
+            for artist in self._visible:
+                ralbum = self._take(artist)
+                if ralbum is not None:
+                    return ralbum
+            while self._next < len(self._order):
+                ralbum = self._take(self._order[self._next])
+                if ralbum is not None:
+                    return ralbum
+                self._next += 1
+            return None